@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Benchmark in-process da API TodoList.
+Executa o app FastAPI via transporte ASGI do httpx contra um backend de
+armazenamento local (memory ou sqlite) e reporta latências p50/p95/p99 e
+throughput em JSON, para comparar resultados entre commits.
+
+Uso:
+    python benchmark_api.py --output bench.json
+    python benchmark_api.py --backend sqlite --compare bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import httpx
+
+TEST_PASSWORD = "teste123456"
+
+# (checklists, itens por checklist) usados no cenário de listagem
+LIST_SIZES = [(10, 5), (100, 5), (200, 20)]
+# Quantidade de itens enviados em cada PUT /checklists/{id}/items
+BULK_SIZES = [10, 100, 1000]
+# Amostras mínimas dos cenários com menos requisições, para p95/p99 não serem ruído
+MIN_SAMPLES = 20
+
+def configure_storage(backend: str, bcrypt_rounds: int):
+    """Seleciona o backend e o custo do bcrypt antes de importar o app (config.settings é lido na importação)"""
+    os.environ["STORAGE_BACKEND"] = backend
+    os.environ["BCRYPT_ROUNDS"] = str(bcrypt_rounds)
+    # Todas as requisições saem do mesmo cliente; o limitador de login barraria o cenário de login
+    os.environ["LOGIN_RATE_LIMIT_ENABLED"] = "false"
+    if backend == "sqlite":
+        os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="todolist-bench-"), "bench.db")
+
+def percentile(sorted_values, fraction):
+    """Percentil pelo método nearest-rank"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def summarize(latencies, errors, wall_time):
+    latencies = sorted(latencies)
+    total = len(latencies) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+        "throughput_rps": round(total / wall_time, 2) if wall_time > 0 else None
+    }
+
+async def measure(iterations, concurrency, make_request, expected_status=None):
+    """
+    Executa make_request(i) iterations vezes com até concurrency requisições simultâneas.
+    Respostas >= 400 contam como erro, exceto expected_status.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    
+    async def run_one(i):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await make_request(i)
+            elapsed = time.perf_counter() - start
+            if response.status_code >= 400 and response.status_code != expected_status:
+                errors += 1
+            else:
+                latencies.append(elapsed)
+    
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(run_one(i) for i in range(iterations)))
+    return summarize(latencies, errors, time.perf_counter() - wall_start)
+
+async def signup(client, email=None):
+    payload = {
+        "email": email or f"bench_{uuid.uuid4().hex[:12]}@teste.com",
+        "password": TEST_PASSWORD,
+        "name": "Benchmark"
+    }
+    response = await client.post("/auth/signup", json=payload)
+    response.raise_for_status()
+    return payload["email"], {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def create_checklists(client, headers, checklists, items_per_checklist):
+    for i in range(checklists):
+        response = await client.post("/checklists", json={"name": f"Checklist {i}"}, headers=headers)
+        response.raise_for_status()
+        checklist_id = response.json()["id"]
+        if items_per_checklist:
+            items = [{"title": f"Item {j}", "completed": j % 2 == 0} for j in range(items_per_checklist)]
+            response = await client.put(f"/checklists/{checklist_id}/items", json={"items": items}, headers=headers)
+            response.raise_for_status()
+
+async def run_benchmarks(app, args):
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            # Auth: cada signup/login executa um bcrypt completo
+            print("🔧 signup/login...", file=sys.stderr)
+            auth_iterations = max(MIN_SAMPLES, args.iterations // 5)
+            results["signup"] = await measure(auth_iterations, args.concurrency, lambda i: client.post(
+                "/auth/signup",
+                json={"email": f"signup_{uuid.uuid4().hex[:12]}@teste.com", "password": TEST_PASSWORD, "name": "Benchmark"}
+            ))
+            
+            email, headers = await signup(client)
+            results["login"] = await measure(auth_iterations, args.concurrency, lambda i: client.post(
+                "/auth/login", json={"email": email, "password": TEST_PASSWORD}
+            ))
+            
+            # E-mail inexistente: deve custar o mesmo que uma senha errada
+            results["login_unknown_user"] = await measure(auth_iterations, args.concurrency, lambda i: client.post(
+                "/auth/login", json={"email": f"missing_{uuid.uuid4().hex[:12]}@teste.com", "password": TEST_PASSWORD}
+            ), expected_status=401)
+            
+            results["auth_me"] = await measure(args.iterations, args.concurrency, lambda i: client.get(
+                "/auth/me", headers=headers
+            ))
+            
+            # GET /checklists com volumes crescentes
+            for checklists, items_per_checklist in LIST_SIZES:
+                print(f"🔧 GET /checklists ({checklists}x{items_per_checklist})...", file=sys.stderr)
+                _, list_headers = await signup(client)
+                await create_checklists(client, list_headers, checklists, items_per_checklist)
+                results[f"get_checklists_{checklists}x{items_per_checklist}"] = await measure(
+                    args.iterations, args.concurrency, lambda i: client.get("/checklists", headers=list_headers)
+                )
+            
+            # PUT /checklists/{id}/items substituindo a lista inteira
+            for bulk_size in BULK_SIZES:
+                print(f"🔧 PUT items ({bulk_size})...", file=sys.stderr)
+                _, bulk_headers = await signup(client)
+                response = await client.post("/checklists", json={"name": "Bulk"}, headers=bulk_headers)
+                checklist_id = response.json()["id"]
+                items = [{"title": f"Item {j}", "completed": False} for j in range(bulk_size)]
+                bulk_iterations = max(MIN_SAMPLES, args.iterations // max(1, bulk_size // 10))
+                # Uma checklist compartilhada: as gravações são serializadas para não competir entre si
+                results[f"bulk_items_{bulk_size}"] = await measure(bulk_iterations, 1, lambda i: client.put(
+                    f"/checklists/{checklist_id}/items", json={"items": items}, headers=bulk_headers
+                ))
+    
+    return results
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(report, baseline):
+    """Imprime a variação de p50/p95/throughput em relação a um relatório anterior"""
+    print(f"📊 Comparação com {baseline['meta'].get('commit')}:", file=sys.stderr)
+    for name, current in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        deltas = []
+        for metric in ("p50_ms", "p95_ms", "throughput_rps"):
+            if current.get(metric) and previous.get(metric):
+                change = (current[metric] - previous[metric]) / previous[metric] * 100
+                deltas.append(f"{metric} {change:+.1f}%")
+        print(f"   {name}: {', '.join(deltas)}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark in-process da API TodoList")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--iterations", type=int, default=200, help="requisições por cenário")
+    parser.add_argument("--concurrency", type=int, default=10, help="requisições simultâneas")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="custo do bcrypt (BCRYPT_ROUNDS)")
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--compare", help="relatório JSON anterior para comparação")
+    args = parser.parse_args()
+    
+    configure_storage(args.backend, args.bcrypt_rounds)
+    from main import app
+    
+    started_at = datetime.utcnow()
+    scenarios = asyncio.run(run_benchmarks(app, args))
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": started_at.isoformat(),
+            "backend": args.backend,
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "bcrypt_rounds": args.bcrypt_rounds,
+            "python": platform.python_version(),
+            "platform": platform.platform()
+        },
+        "scenarios": scenarios
+    }
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark da autenticação por requisição.
+Mede o custo de decode_access_token e de get_current_user (com o cache de
+usuários aquecido) com e sem o cache de tokens decodificados, isolando o
+overhead de verificação do JWT que cada rota autenticada paga.
+
+Uso:
+    python benchmark_auth.py
+    python benchmark_auth.py --iterations 50000 --output auth.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+def configure_storage():
+    """Backend em memória e caches padrão, antes de importar o app (config.settings é lido na importação)"""
+    os.environ["STORAGE_BACKEND"] = "memory"
+
+def per_call_us(iterations, func):
+    """Tempo médio por chamada em microssegundos"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+async def per_call_us_async(iterations, func):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await func()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+async def run_benchmarks(args):
+    import main
+    from fastapi.security import HTTPAuthorizationCredentials
+    
+    user_id = await main.storage.users.create({
+        "email": "bench@teste.com",
+        "name": "Benchmark",
+        "password": "",
+        "token_version": 0,
+        "created_at": datetime.utcnow()
+    })
+    token = main.create_user_access_token(user_id, "bench@teste.com")
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    max_size = main.token_cache.max_size
+    
+    results = {}
+    for label, size in (("uncached", 0), ("cached", max_size)):
+        print(f"🔧 {label}...", file=sys.stderr)
+        main.token_cache.max_size = size
+        main.token_cache.clear()
+        # Aquecimento: preenche o cache de usuários (e o de tokens, quando ativo)
+        await main.get_current_user(credentials)
+        
+        results[f"decode_access_token_{label}_us"] = round(
+            per_call_us(args.iterations, lambda: main.decode_access_token(token)), 3
+        )
+        results[f"get_current_user_{label}_us"] = round(
+            await per_call_us_async(args.iterations, lambda: main.get_current_user(credentials)), 3
+        )
+    
+    main.token_cache.max_size = max_size
+    for name in ("decode_access_token", "get_current_user"):
+        before = results[f"{name}_uncached_us"]
+        after = results[f"{name}_cached_us"]
+        results[f"{name}_speedup"] = round(before / after, 2) if after else None
+        print(f"   {name}: {before:.1f} µs -> {after:.1f} µs", file=sys.stderr)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark da autenticação por requisição")
+    parser.add_argument("--iterations", type=int, default=20000, help="chamadas por medição")
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+    
+    configure_storage()
+    started_at = datetime.utcnow()
+    results = asyncio.run(run_benchmarks(args))
+    report = {
+        "meta": {
+            "started_at": started_at.isoformat(),
+            "iterations": args.iterations,
+            "python": platform.python_version(),
+            "platform": platform.platform()
+        },
+        "results": results
+    }
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
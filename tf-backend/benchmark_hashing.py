@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos esquemas de hash de senha.
+Mede, na máquina atual, hashes/s e verificações/s de cada esquema e custo
+(bcrypt por rounds, argon2id por tempo/memória/paralelismo), usando o mesmo
+pool de threads do PasswordService, para escolher PASSWORD_SCHEMES,
+BCRYPT_ROUNDS e ARGON2_* de acordo com o hardware.
+
+Uso:
+    python benchmark_hashing.py
+    python benchmark_hashing.py --iterations 50 --workers 4 --output hashing.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+from password_service import PasswordService, create_crypt_context
+
+TEST_PASSWORD = "teste123456"
+
+# Custos do bcrypt (2^rounds iterações)
+BCRYPT_ROUNDS = [10, 11, 12, 13]
+# Parâmetros do argon2id: (time_cost, memory_cost em KiB, parallelism)
+ARGON2_PARAMS = [(2, 19456, 1), (3, 65536, 4), (4, 131072, 4)]
+
+def configurations():
+    """(nome, esquema, parâmetros do create_crypt_context) de cada configuração medida"""
+    for rounds in BCRYPT_ROUNDS:
+        yield f"bcrypt_r{rounds}", "bcrypt", {"bcrypt_rounds": rounds}
+    for time_cost, memory_cost, parallelism in ARGON2_PARAMS:
+        yield f"argon2id_t{time_cost}_m{memory_cost}_p{parallelism}", "argon2", {
+            "argon2_time_cost": time_cost,
+            "argon2_memory_cost": memory_cost,
+            "argon2_parallelism": parallelism
+        }
+
+def crypt_context(scheme, params):
+    options = {
+        "bcrypt_rounds": 12,
+        "argon2_time_cost": 3,
+        "argon2_memory_cost": 65536,
+        "argon2_parallelism": 4
+    }
+    options.update(params)
+    return create_crypt_context([scheme], **options)
+
+async def measure(iterations, func):
+    """Executa iterations chamadas de func em paralelo e retorna (latência média em s, operações/s)"""
+    latencies = []
+
+    async def run_one():
+        start = time.perf_counter()
+        await func()
+        latencies.append(time.perf_counter() - start)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(run_one() for _ in range(iterations)))
+    wall_time = time.perf_counter() - wall_start
+    return sum(latencies) / len(latencies), iterations / wall_time
+
+async def benchmark(name, scheme, context, args):
+    # Fila grande o bastante para nenhuma chamada ser rejeitada por saturação
+    service = PasswordService(
+        max_workers=args.workers, queue_limit=args.iterations, pwd_context=context, dummy_hash_scheme=scheme
+    )
+    try:
+        hashed = await service.hash(TEST_PASSWORD)
+        hash_latency, hashes_per_second = await measure(args.iterations, lambda: service.hash(TEST_PASSWORD))
+        verify_latency, verifies_per_second = await measure(args.iterations, lambda: service.verify(TEST_PASSWORD, hashed))
+    finally:
+        service.executor.shutdown(wait=True)
+
+    print(f"   {name}: {hashes_per_second:.1f} hashes/s, {hash_latency * 1000:.1f} ms por hash", file=sys.stderr)
+    return {
+        "hash_mean_ms": round(hash_latency * 1000, 3),
+        "hashes_per_second": round(hashes_per_second, 2),
+        "verify_mean_ms": round(verify_latency * 1000, 3),
+        "verifies_per_second": round(verifies_per_second, 2)
+    }
+
+async def run_benchmarks(args):
+    results = {}
+    for name, scheme, params in configurations():
+        if args.scheme and scheme != args.scheme:
+            continue
+        results[name] = await benchmark(name, scheme, crypt_context(scheme, params), args)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos esquemas de hash de senha")
+    parser.add_argument("--iterations", type=int, default=20, help="hashes e verificações por configuração")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="threads do pool de hash")
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], help="mede apenas um esquema")
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    print("🔧 Medindo esquemas de hash...", file=sys.stderr)
+    started_at = datetime.utcnow()
+    configurations_results = asyncio.run(run_benchmarks(args))
+    report = {
+        "meta": {
+            "started_at": started_at.isoformat(),
+            "iterations": args.iterations,
+            "workers": args.workers,
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+            "platform": platform.platform()
+        },
+        "configurations": configurations_results
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
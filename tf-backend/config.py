@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import List
+from typing import List, Literal, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -11,6 +11,10 @@ class Settings(BaseSettings):
     firebase_project_id: str = "project-tafeito"
     firebase_credentials_path: str = "firebase-credentials.json"
     
+    # Storage backend: Firestore in production, memory or SQLite for local runs and benchmarks
+    storage_backend: Literal["firestore", "memory", "sqlite"] = "firestore"
+    sqlite_path: str = "todolist.db"
+    
     # CORS settings
     allowed_origins: List[str] = [
         "http://localhost:4200",  # Angular dev server
@@ -22,6 +26,55 @@ class Settings(BaseSettings):
     secret_key: str = "your-secret-key-here-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    # Accept tokens issued before the user id claim was added
+    legacy_email_tokens_enabled: bool = True
+    # Lifetime of a refresh token; each refresh rotates it and restarts the lifetime
+    refresh_token_expire_days: int = 30
+    
+    # Password hashing worker pool
+    password_hash_workers: int = 4
+    password_hash_queue_limit: int = 64
+    # Password hash schemes: the first hashes new passwords, the others are only verified
+    # and upgraded on the next successful login (e.g. ["argon2", "bcrypt"])
+    password_schemes: List[str] = ["bcrypt"]
+    # bcrypt cost factor (2^rounds iterations); hashes below it are upgraded on login
+    bcrypt_rounds: int = 12
+    # argon2id parameters: iterations, memory in KiB and lanes; hashes below the time or
+    # memory cost are upgraded on login
+    argon2_time_cost: int = 3
+    argon2_memory_cost: int = 65536
+    argon2_parallelism: int = 4
+    # Scheme of the dummy hash verified for unknown emails, which should match most stored
+    # hashes so that their logins take as long as a wrong password. Defaults to the last of
+    # password_schemes (the one most users still have right after adding a new scheme);
+    # set it to the first once most users have logged in and been upgraded.
+    password_dummy_hash_scheme: Optional[str] = None
+    
+    # Login rate limiting: token buckets per client IP and per email (capacity, then refill per minute)
+    login_rate_limit_enabled: bool = True
+    login_ip_capacity: int = 20
+    login_ip_refill_per_minute: float = 10
+    login_email_capacity: int = 5
+    login_email_refill_per_minute: float = 1
+    login_rate_limit_max_keys: int = 100000
+    
+    # Authenticated user cache (0 disables it)
+    user_cache_max_size: int = 10000
+    user_cache_ttl_seconds: int = 60
+    # Decoded access token cache, entries kept until the token expires (0 disables it)
+    token_cache_max_size: int = 10000
+    
+    # Tracing spans around storage calls and password hashing: none, memory or console
+    tracing_exporter: Literal["none", "memory", "console"] = "none"
+    tracing_max_spans: int = 2000
+    
+    # Checklist change events (SSE): in-process, or relayed through Firestore for multi-worker deployments
+    events_backend: Literal["memory", "firestore"] = "memory"
+    events_queue_size: int = 100
+    events_heartbeat_seconds: int = 15
+    events_retention_hours: int = 24
+    # Lifetime of the tokens that let EventSource open /checklists/events?token=...
+    events_token_expire_seconds: int = 60
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,141 @@
+import asyncio
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Set
+from config import settings
+
+# Collection relaying events between workers in the Firestore mode; give it a
+# TTL policy on expires_at so old events are purged
+EVENTS_COLLECTION = "checklist_events"
+
+class Subscription:
+    """Bounded queue of the events delivered to one connected client"""
+    
+    def __init__(self, user_id: str, queue_size: int):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=queue_size)
+    
+    def deliver(self, event: dict) -> bool:
+        """Queue the event, or replace the backlog with a resync event when the client is too slow"""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"id": uuid.uuid4().hex, "type": "resync"})
+            return False
+
+class EventBroker:
+    """In-process pub/sub of checklist change events, fanned out per user"""
+    
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.subscriptions: Dict[str, Set[Subscription]] = defaultdict(set)
+        self.published = 0
+        self.dropped = 0
+        self.failed = 0
+    
+    def subscribe(self, user_id: str) -> Subscription:
+        subscription = Subscription(user_id, self.queue_size)
+        self.subscriptions[user_id].add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        user_subscriptions = self.subscriptions.get(subscription.user_id)
+        if user_subscriptions is None:
+            return
+        user_subscriptions.discard(subscription)
+        if not user_subscriptions:
+            del self.subscriptions[subscription.user_id]
+    
+    def dispatch(self, user_id: str, event: dict):
+        """Deliver an event to the subscriptions of this process"""
+        for subscription in list(self.subscriptions.get(user_id, ())):
+            if not subscription.deliver(event):
+                self.dropped += 1
+    
+    async def publish(self, user_id: str, event_type: str, data: dict):
+        self.published += 1
+        self.dispatch(user_id, {"id": uuid.uuid4().hex, "type": event_type, "data": data})
+    
+    def stats(self) -> dict:
+        return {
+            "subscribers": sum(len(subscriptions) for subscriptions in self.subscriptions.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+            "failed": self.failed
+        }
+
+class FirestoreEventBroker(EventBroker):
+    """
+    Relays events through a Firestore collection so every worker sees them.
+    Publishing writes an event document; each worker keeps one snapshot listener
+    per user with local subscribers and dispatches the documents it receives.
+    """
+    
+    def __init__(self, firebase_service, queue_size: int, retention: timedelta):
+        super().__init__(queue_size)
+        self.firebase_service = firebase_service
+        self.retention = retention
+        self.listeners = {}
+    
+    def subscribe(self, user_id: str) -> Subscription:
+        subscription = super().subscribe(user_id)
+        if user_id not in self.listeners:
+            self.listeners[user_id] = self.listen(user_id, asyncio.get_running_loop())
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        super().unsubscribe(subscription)
+        if subscription.user_id not in self.subscriptions and subscription.user_id in self.listeners:
+            self.listeners.pop(subscription.user_id).unsubscribe()
+    
+    def listen(self, user_id: str, loop: asyncio.AbstractEventLoop):
+        # Needs the composite index on (user_id, created_at) from firestore.indexes.json
+        events_query = (
+            self.firebase_service.get_sync_db().collection(EVENTS_COLLECTION)
+            .where("user_id", "==", user_id)
+            .where("created_at", ">=", datetime.utcnow())
+        )
+        
+        def on_snapshot(documents, changes, read_time):
+            # Runs on the listener thread; hand the events over to the event loop
+            for change in changes:
+                if change.type.name == "ADDED":
+                    event = change.document.to_dict()["event"]
+                    loop.call_soon_threadsafe(self.dispatch, user_id, event)
+        
+        return events_query.on_snapshot(on_snapshot)
+    
+    async def publish(self, user_id: str, event_type: str, data: dict):
+        """Relay an event; never raises, since the write it describes is already committed"""
+        self.published += 1
+        try:
+            await self.add_event(user_id, {"id": uuid.uuid4().hex, "type": event_type, "data": data})
+        except Exception:
+            # Typically an event above the 1 MiB document limit: ask the clients to reload instead
+            self.failed += 1
+            try:
+                await self.add_event(user_id, {"id": uuid.uuid4().hex, "type": "resync"})
+            except Exception:
+                pass
+    
+    async def add_event(self, user_id: str, event: dict):
+        now = datetime.utcnow()
+        await self.firebase_service.get_db().collection(EVENTS_COLLECTION).add({
+            "user_id": user_id,
+            "event": event,
+            "created_at": now,
+            "expires_at": now + self.retention
+        })
+
+def create_event_broker() -> EventBroker:
+    if settings.events_backend == "firestore":
+        from firebase_service import firebase_service
+        return FirestoreEventBroker(firebase_service, settings.events_queue_size, timedelta(hours=settings.events_retention_hours))
+    return EventBroker(settings.events_queue_size)
+
+# Global event broker, fed by the checklist write routes
+event_broker = create_event_broker()
@@ -1,12 +1,12 @@
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore, firestore_async
 from config import settings
 import os
 
 class FirebaseService:
     def __init__(self):
         self.db = None
-        self.initialize_firebase()
+        self.sync_db = None
     
     def initialize_firebase(self):
         """Initialize Firebase Admin SDK"""
@@ -25,11 +25,21 @@ class FirebaseService:
                 # Use default credentials (for development/testing)
                 firebase_admin.initialize_app()
         
-        self.db = firestore.client()
+        # Async client, so routes await Firestore I/O instead of blocking the event loop
+        self.db = firestore_async.client()
     
     def get_db(self):
-        """Get Firestore database instance"""
+        """Get the async Firestore database instance, initializing Firebase on first use"""
+        if self.db is None:
+            self.initialize_firebase()
         return self.db
+    
+    def get_sync_db(self):
+        """Get the synchronous Firestore client, needed for snapshot listeners"""
+        if self.sync_db is None:
+            self.get_db()
+            self.sync_db = firestore.client()
+        return self.sync_db
 
 # Global Firebase service instance
 firebase_service = FirebaseService()
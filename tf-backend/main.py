@@ -1,23 +1,39 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Header, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from passlib.context import CryptContext
 from jose import JWTError, jwt
+from pydantic import ValidationError
 from datetime import datetime, timedelta
-from typing import Optional, List
+from typing import Optional, List, Dict, Literal
+from collections import OrderedDict
+import asyncio
+import hashlib
+import math
+import orjson
+import secrets
 import uuid
 
 from config import settings
 from models import (
     User, UserCreate, UserLogin, UserResponse,
-    Checklist, ChecklistCreate, ChecklistUpdate,
-    ChecklistItem, ChecklistItemCreate, ChecklistItemUpdate, ChecklistItemsBulkUpdate,
-    Token, TokenData
+    Checklist, ChecklistCreate, ChecklistUpdate, ChecklistResponse,
+    ChecklistItem, ChecklistItemCreate, ChecklistItemUpdate, ChecklistItemsBulkUpdate, ChecklistItemsUpdateResponse,
+    ChecklistSummary, ChecklistItemsPatch, ChecklistItemsPatchResponse, ChecklistImportRow,
+    Token, TokenData, RefreshTokenRequest
 )
-from firebase_service import firebase_service
+from serializers import ORJSONBytesResponse, dumps, item_order, serialize_checklist, serialize_item
+from storage import storage, InvalidCursorError, VersionConflictError
+from password_service import password_service, PasswordPoolSaturatedError
+from user_cache import user_cache
+from token_cache import token_cache
+from metrics import registry, Counter, Gauge, MetricsMiddleware
+from tracing import tracer, TracingMiddleware
+from events import event_broker
+from rate_limiter import login_rate_limiter
 from models import UserUpdate, PasswordChange
 
-app = FastAPI(title=settings.app_name, debug=settings.debug)
+app = FastAPI(title=settings.app_name, debug=settings.debug, default_response_class=ORJSONBytesResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -26,17 +42,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
+# Request metrics, exposed on /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Root span of each request; a no-op unless tracing is enabled
+app.add_middleware(TracingMiddleware)
+
 # Security
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# For routes that also accept a token in the query string
+optional_security = HTTPBearer(auto_error=False)
+
+def password_pool_saturated_exception():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servidor ocupado. Tente novamente em instantes.",
+        headers={"Retry-After": "1"},
+    )
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    with tracer.start_span("password.verify", **{"password.pending_jobs": password_service.pending}):
+        try:
+            return await password_service.verify(plain_password, hashed_password)
+        except PasswordPoolSaturatedError:
+            raise password_pool_saturated_exception()
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    with tracer.start_span("password.hash", **{"password.pending_jobs": password_service.pending}):
+        try:
+            return await password_service.hash(password)
+        except PasswordPoolSaturatedError:
+            raise password_pool_saturated_exception()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -48,126 +87,304 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    credentials_exception = HTTPException(
+def create_user_access_token(user_id: str, email: str, token_version: int = 0):
+    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
+    return create_access_token(
+        data={"sub": email, "uid": user_id, "ver": token_version}, expires_delta=access_token_expires
+    )
+
+def hash_refresh_token(refresh_token: str) -> str:
+    # Refresh tokens are random 256-bit values, so a fast hash is enough to keep them out of storage
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+def new_refresh_token(user_id: str, token_version: int, now: datetime):
+    """Generate a refresh token, returning (token, token_hash, data to store)"""
+    refresh_token = secrets.token_urlsafe(32)
+    data = {
+        "user_id": user_id,
+        "token_version": token_version,
+        "created_at": now,
+        "expires_at": now + timedelta(days=settings.refresh_token_expire_days),
+        "revoked_at": None,
+        "replaced_by": None
+    }
+    return refresh_token, hash_refresh_token(refresh_token), data
+
+async def create_refresh_token(user_id: str, token_version: int = 0) -> str:
+    refresh_token, token_hash, data = new_refresh_token(user_id, token_version, datetime.utcnow())
+    await storage.refresh_tokens.create(token_hash, data)
+    return refresh_token
+
+def refresh_token_expired(token_data: dict, now: datetime) -> bool:
+    expires_at = token_data['expires_at']
+    # Firestore returns timezone-aware UTC datetimes
+    if expires_at.tzinfo is not None:
+        expires_at = expires_at.replace(tzinfo=None)
+    return expires_at <= now
+
+def refresh_token_exception():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Sessão expirada. Faça login novamente.",
+    )
+
+def credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+
+def decode_access_token(token: str) -> TokenData:
+    # A token already verified by this process skips the signature check and payload parsing
+    token_data = token_cache.get(token)
+    if token_data is None:
+        try:
+            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        except JWTError:
+            raise credentials_exception()
+        
         email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
+        # Scoped tokens (such as event stream tokens) are only accepted by their own route
+        if email is None or payload.get("scope") is not None:
+            raise credentials_exception()
+        
+        token_data = TokenData(email=email, user_id=payload.get("uid"), token_version=payload.get("ver"))
+        if payload.get("exp") is not None:
+            token_cache.set(token, token_data, payload["exp"])
+    
+    # Email-only tokens predate the user id claim and are accepted only during the migration window
+    if token_data.user_id is None and not settings.legacy_email_tokens_enabled:
+        raise credentials_exception()
+    return token_data
+
+async def fetch_token_user(token_data: TokenData) -> Optional[dict]:
+    if token_data.user_id is not None:
+        user_data = await storage.users.get(token_data.user_id)
+    else:
+        # Legacy token: find the user by email
+        user_data = await storage.users.get_by_email(token_data.email)
     
-    # Get user from Firestore
-    db = firebase_service.get_db()
-    users_ref = db.collection('users')
-    user_query = users_ref.where('email', '==', token_data.email).limit(1)
-    users = user_query.stream()
+    if user_data is None:
+        return None
     
-    user_doc = None
-    for user in users:
-        user_doc = user
-        break
+    # The password hash is never needed by the routes, so keep it out of the cache
+    user_data.pop('password', None)
+    return user_data
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await load_token_user(decode_access_token(credentials.credentials))
+
+async def load_token_user(token_data: TokenData) -> dict:
+    """User of a verified token, through the user cache, rejecting revoked token versions"""
+    user_data = user_cache.get(token_data.email)
+    if user_data is None:
+        user_data = await fetch_token_user(token_data)
+        if user_data is None:
+            raise credentials_exception()
+        user_cache.set(token_data.email, user_data)
     
-    if user_doc is None:
-        raise credentials_exception
+    # Tokens issued before the last revocation carry an older version
+    if token_data.token_version is not None and token_data.token_version != user_data.get('token_version', 0):
+        raise credentials_exception()
     
-    user_data = user_doc.to_dict()
-    user_data['id'] = user_doc.id
     return user_data
 
+async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
+    """
+    Resolve only the id of the authenticated user.
+    The user comes from the user cache, so most requests skip the lookup, and
+    the token version is still checked: tokens revoked by a password change are
+    rejected at once on this process and within user_cache_ttl_seconds on others.
+    """
+    user_data = await get_current_user(credentials)
+    return user_data['id']
+
+def collect_cache_metrics():
+    stats = user_cache.stats()
+    hits = Counter("user_cache_hits_total", "Authenticated user cache hits")
+    hits.inc(stats["hits"])
+    misses = Counter("user_cache_misses_total", "Authenticated user cache misses")
+    misses.inc(stats["misses"])
+    size = Gauge("user_cache_size", "Users currently cached")
+    size.set(stats["size"])
+    token_stats = token_cache.stats()
+    token_hits = Counter("token_cache_hits_total", "Decoded access token cache hits")
+    token_hits.inc(token_stats["hits"])
+    token_misses = Counter("token_cache_misses_total", "Decoded access token cache misses")
+    token_misses.inc(token_stats["misses"])
+    token_size = Gauge("token_cache_size", "Decoded access tokens currently cached")
+    token_size.set(token_stats["size"])
+    password_jobs = Gauge("password_hash_pending_jobs", "Password hashing jobs running or queued")
+    password_jobs.set(password_service.pending)
+    event_stats = event_broker.stats()
+    subscribers = Gauge("checklist_event_subscribers", "Clients connected to /checklists/events")
+    subscribers.set(event_stats["subscribers"])
+    published = Counter("checklist_events_published_total", "Checklist change events published")
+    published.inc(event_stats["published"])
+    dropped = Counter("checklist_events_dropped_total", "Events replaced by a resync for clients that fell behind")
+    dropped.inc(event_stats["dropped"])
+    failed = Counter("checklist_events_failed_total", "Events that could not be relayed and were replaced by a resync")
+    failed.inc(event_stats["failed"])
+    return [hits, misses, size, token_hits, token_misses, token_size, password_jobs, subscribers, published, dropped, failed]
+
+registry.register_collector(collect_cache_metrics)
+
 # Routes
 @app.get("/")
 async def root():
     return {"message": "TodoList Backend API"}
 
+if settings.tracing_exporter == "memory":
+    @app.get("/debug/traces", include_in_schema=False)
+    async def debug_traces(limit: int = Query(20, ge=1, le=200)):
+        """Most recent traces kept by the in-memory exporter"""
+        return tracer.exporter.traces(limit)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of the request, storage and cache metrics"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/auth/signup", response_model=UserResponse)
 async def signup(user: UserCreate):
-    db = firebase_service.get_db()
-    
     # Check if user already exists
-    users_ref = db.collection('users')
-    existing_user = users_ref.where('email', '==', user.email).limit(1)
+    existing_user = await storage.users.get_by_email(user.email)
     
-    if len(list(existing_user.stream())) > 0:
+    if existing_user is not None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Este e-mail já existe."
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     user_data = {
         "email": user.email,
         "name": user.name,
         "phone": user.phone,
         "password": hashed_password,
+        "token_version": 0,
         "created_at": datetime.utcnow()
     }
     
-    # Add user to Firestore
-    doc_ref = users_ref.add(user_data)
-    user_id = doc_ref[1].id
+    # Add user to storage
+    user_id = await storage.users.create(user_data)
     
-    # Create access token
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
+    # Create access and refresh tokens
+    access_token = create_user_access_token(user_id, user.email)
+    refresh_token = await create_refresh_token(user_id)
     
     return UserResponse(
         id=user_id,
         email=user.email,
         name=user.name,
         phone=user.phone,
-        access_token=access_token
+        access_token=access_token,
+        refresh_token=refresh_token
     )
 
+async def upgrade_password_hash(user_id: str, password: str, old_hash: str):
+    """Rehash a password with the current scheme and parameters after the login response is sent"""
+    with tracer.start_span("password.rehash", **{"password.pending_jobs": password_service.pending}):
+        try:
+            new_hash = await password_service.hash(password)
+        except PasswordPoolSaturatedError:
+            # Left for a later login
+            return
+    
+    # Skip the write if the password changed while rehashing
+    user_data = await storage.users.get(user_id)
+    if user_data is not None and user_data.get('password') == old_hash:
+        await storage.users.update(user_id, {"password": new_hash})
+        user_cache.invalidate(user_data['email'])
+
 @app.post("/auth/login", response_model=UserResponse)
-async def login(user_credentials: UserLogin):
-    db = firebase_service.get_db()
-    users_ref = db.collection('users')
+async def login(user_credentials: UserLogin, request: Request, background_tasks: BackgroundTasks):
+    # Reject throttled attempts before any storage or bcrypt work
+    retry_after = await login_rate_limiter.check(request.client.host if request.client else None, user_credentials.email)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas de login. Tente novamente mais tarde.",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
     
     # Find user by email
-    user_query = users_ref.where('email', '==', user_credentials.email).limit(1)
-    users = list(user_query.stream())
+    user_data = await storage.users.get_by_email(user_credentials.email)
     
-    if not users:
+    if user_data is None:
+        # Verify against the dummy hash, so an unknown email costs as much as a wrong password
+        await verify_password(user_credentials.password, password_service.dummy_hash)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="E-mail e/ou senha incorreta."
         )
     
-    user_doc = users[0]
-    user_data = user_doc.to_dict()
-    
     # Verify password
-    if not verify_password(user_credentials.password, user_data['password']):
+    if not await verify_password(user_credentials.password, user_data['password']):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="E-mail e/ou senha incorreta."
         )
     
-    # Create access token
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": user_credentials.email}, expires_delta=access_token_expires
+    await login_rate_limiter.login_succeeded(user_credentials.email)
+    
+    # Hashes from a deprecated scheme or weaker parameters are upgraded off the request path
+    if password_service.needs_update(user_data['password']):
+        background_tasks.add_task(upgrade_password_hash, user_data['id'], user_credentials.password, user_data['password'])
+    
+    # Create access and refresh tokens
+    access_token = create_user_access_token(
+        user_data['id'], user_data['email'], user_data.get('token_version', 0)
     )
+    refresh_token = await create_refresh_token(user_data['id'], user_data.get('token_version', 0))
     
     return UserResponse(
-        id=user_doc.id,
+        id=user_data['id'],
         email=user_data['email'],
         name=user_data['name'],
         phone=user_data.get('phone'),
-        access_token=access_token
+        access_token=access_token,
+        refresh_token=refresh_token
     )
 
+@app.post("/auth/refresh", response_model=Token)
+async def refresh_session(body: RefreshTokenRequest):
+    """Exchange a refresh token for a new access token and a new refresh token, without a password verify"""
+    token_hash = hash_refresh_token(body.refresh_token)
+    token_data = await storage.refresh_tokens.get(token_hash)
+    now = datetime.utcnow()
+    
+    if token_data is None or refresh_token_expired(token_data, now):
+        raise refresh_token_exception()
+    if token_data.get('revoked_at') is not None:
+        if token_data.get('replaced_by') is not None:
+            # An already rotated token came back, so it may have leaked: end every session of the user
+            await storage.refresh_tokens.revoke_for_user(token_data['user_id'], now)
+        raise refresh_token_exception()
+    
+    # Tokens issued before the last password change are no longer valid
+    user_data = await storage.users.get(token_data['user_id'])
+    if user_data is None or token_data.get('token_version', 0) != user_data.get('token_version', 0):
+        raise refresh_token_exception()
+    
+    refresh_token, new_token_hash, new_token_data = new_refresh_token(
+        user_data['id'], user_data.get('token_version', 0), now
+    )
+    # Fails when a concurrent refresh already rotated the same token
+    if not await storage.refresh_tokens.rotate(token_hash, new_token_hash, new_token_data, now):
+        raise refresh_token_exception()
+    
+    access_token = create_user_access_token(user_data['id'], user_data['email'], user_data.get('token_version', 0))
+    return Token(access_token=access_token, token_type="bearer", refresh_token=refresh_token)
+
+@app.post("/auth/logout", response_model=dict)
+async def logout(body: RefreshTokenRequest):
+    """Revoke a refresh token; the access token stays valid until it expires"""
+    await storage.refresh_tokens.revoke(hash_refresh_token(body.refresh_token), datetime.utcnow())
+    return {"message": "Sessão encerrada"}
+
 @app.get("/auth/me", response_model=dict)
 async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     return {
@@ -180,10 +397,8 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
 
 @app.put("/auth/profile", response_model=dict)
 async def update_profile(update: UserUpdate, current_user: dict = Depends(get_current_user)):
-    db = firebase_service.get_db()
-    doc_ref = db.collection('users').document(current_user['id'])
-    doc = doc_ref.get()
-    if not doc.exists:
+    u = await storage.users.get(current_user['id'])
+    if u is None:
         raise HTTPException(status_code=404, detail="User not found")
 
     update_data = {"updated_at": datetime.utcnow()}
@@ -193,9 +408,10 @@ async def update_profile(update: UserUpdate, current_user: dict = Depends(get_cu
         update_data["phone"] = update.phone
 
     if len(update_data) > 1:
-        doc_ref.update(update_data)
+        await storage.users.update(current_user['id'], update_data)
+        user_cache.invalidate(current_user['email'])
+        u.update(update_data)
 
-    u = doc_ref.get().to_dict()
     return {
         "id": current_user["id"],
         "email": u.get("email"),
@@ -205,25 +421,74 @@ async def update_profile(update: UserUpdate, current_user: dict = Depends(get_cu
 
 @app.put("/auth/password", response_model=dict)
 async def change_password(body: PasswordChange, current_user: dict = Depends(get_current_user)):
-    db = firebase_service.get_db()
-    doc_ref = db.collection('users').document(current_user['id'])
-    doc = doc_ref.get()
-    if not doc.exists:
+    u = await storage.users.get(current_user['id'])
+    if u is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    u = doc.to_dict()
-    if not verify_password(body.current_password, u["password"]):
+    if not await verify_password(body.current_password, u["password"]):
         raise HTTPException(status_code=400, detail="Senha atual incorreta")
 
-    new_hash = get_password_hash(body.new_password)
-    doc_ref.update({"password": new_hash, "updated_at": datetime.utcnow()})
-    return {"message": "Senha alterada com sucesso"}
+    new_hash = await get_password_hash(body.new_password)
+    # Bumping the token version revokes every access token issued with the old password
+    # (other processes notice once their user cache entry expires)
+    token_version = u.get("token_version", 0) + 1
+    now = datetime.utcnow()
+    await storage.users.update(current_user['id'], {"password": new_hash, "token_version": token_version, "updated_at": now})
+    await storage.refresh_tokens.revoke_for_user(current_user['id'], now)
+    user_cache.invalidate(current_user['email'])
+    
+    access_token = create_user_access_token(current_user['id'], u["email"], token_version)
+    refresh_token = await create_refresh_token(current_user['id'], token_version)
+    return {
+        "message": "Senha alterada com sucesso",
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
 
+# Per-user counter bumped after every checklist or item write; checklist reads
+# use it as a weak ETag, so an unchanged dashboard costs a single user read
+CHECKLISTS_VERSION_FIELD = "checklists_version"
+# Let browsers keep the responses but revalidate them on every use
+CHECKLISTS_CACHE_CONTROL = "private, no-cache"
 
-@app.post("/checklists", response_model=dict)
-async def create_checklist(checklist: ChecklistCreate, current_user: dict = Depends(get_current_user)):
-    db = firebase_service.get_db()
-    
+async def get_checklists_version(user_id: str) -> int:
+    user_data = await storage.users.get(user_id)
+    return user_data.get(CHECKLISTS_VERSION_FIELD, 0) if user_data is not None else 0
+
+async def bump_checklists_version(user_id: str):
+    await storage.users.increment(user_id, CHECKLISTS_VERSION_FIELD)
+
+async def checklists_changed(user_id: str, event_type: str, data: dict):
+    """Invalidate the user's checklist ETags and push the change to the connected clients"""
+    await bump_checklists_version(user_id)
+    await event_broker.publish(user_id, event_type, data)
+
+def checklists_etag(user_id: str, version: int) -> str:
+    # The user id is part of the tag, so a browser shared by two accounts never gets a false match
+    digest = hashlib.sha256(f"{user_id}:{version}".encode()).hexdigest()[:16]
+    return f'W/"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of the If-None-Match header against etag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque_tag for tag in if_none_match.split(","))
+
+def checklist_etag(version: Optional[int]) -> str:
+    # Strong tag of a single checklist: its version changes with every checklist or item write,
+    # and clients send it back in If-Match
+    return f'"{version or 0}"'
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": CHECKLISTS_CACHE_CONTROL})
+
+@app.post("/checklists", response_model=Checklist)
+async def create_checklist(checklist: ChecklistCreate, user_id: str = Depends(get_current_user_id)):
     # Convert datetime to timestamp if provided
     limit_date_timestamp = None
     if checklist.limit_date:
@@ -236,150 +501,482 @@ async def create_checklist(checklist: ChecklistCreate, current_user: dict = Depe
         "limit_date": limit_date_timestamp,
         "change_color_by_date": bool(checklist.change_color_by_date),
         "show_motivational_msg": bool(checklist.show_motivational_msg),
-        "user_id": current_user['id'],
+        "user_id": user_id,
+        "items_count": 0,
+        "completed_count": 0,
+        "next_position": 0,
+        "version": 0,
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
     
-    # Add checklist to Firestore
-    checklists_ref = db.collection('checklists')
-    doc_ref = checklists_ref.add(checklist_data)
-    checklist_id = doc_ref[1].id
-    
-    # Prepare response data with proper serialization
-    response_data = {
-        "id": checklist_id,
-        "name": checklist_data["name"],
-        "category": checklist_data["category"],
-        "description": checklist_data["description"],
-        "limit_date": checklist_data["limit_date"].isoformat() if checklist_data["limit_date"] else None,
-        "change_color_by_date": checklist_data["change_color_by_date"],
-        "show_motivational_msg": checklist_data["show_motivational_msg"],
-        "user_id": checklist_data["user_id"],
-        "created_at": checklist_data["created_at"].isoformat(),
-        "updated_at": checklist_data["updated_at"].isoformat(),
-        "items": []
+    # Add checklist to storage
+    checklist_id = await storage.checklists.create(checklist_data)
+    
+    response_checklist = serialize_checklist(checklist_id, checklist_data)
+    response_checklist["items"] = []
+    await checklists_changed(user_id, "checklist.created", response_checklist)
+    
+    return ORJSONBytesResponse(response_checklist)
+
+# Item counts denormalized on each checklist, kept in sync by the item writes
+ITEM_COUNT_FIELDS = ["items_count", "completed_count"]
+
+def count_items(items: List[dict]) -> dict:
+    return {
+        "items_count": len(items),
+        "completed_count": sum(1 for item in items if item.get("completed"))
     }
+
+async def load_item_counts(checklist_records: List[dict], user_id: Optional[str] = None) -> Dict[str, dict]:
+    """
+    Item counts of each checklist, taken from the checklist documents.
+    Checklists written before the counts were denormalized are counted from
+    their items, and with user_id the counts are stored back on them.
+    The records must include the version: the counts are only stored if no item
+    write committed since, and without bumping it, so the checklist's ETag still
+    holds; the list ETags of the user are invalidated.
+    """
+    counts_by_checklist = {}
+    missing_ids = []
+    for checklist_data in checklist_records:
+        if all(field in checklist_data for field in ITEM_COUNT_FIELDS):
+            counts_by_checklist[checklist_data['id']] = {field: checklist_data[field] for field in ITEM_COUNT_FIELDS}
+        else:
+            missing_ids.append(checklist_data['id'])
+    
+    if missing_ids:
+        versions = {checklist_data['id']: checklist_data.get('version', 0) for checklist_data in checklist_records}
+        missing_counts = await storage.items.count_for_checklists(missing_ids)
+        stored = False
+        for checklist_id in missing_ids:
+            counts_by_checklist[checklist_id] = missing_counts[checklist_id]
+            if user_id is None:
+                continue
+            try:
+                await storage.checklists.update_if_version(checklist_id, missing_counts[checklist_id], versions[checklist_id])
+                stored = True
+            except VersionConflictError:
+                # A concurrent item write already stored fresher counts
+                pass
+        if stored:
+            await bump_checklists_version(user_id)
+    
+    return counts_by_checklist
+
+# Checklist fields that can be requested through the fields= projection
+CHECKLIST_FIELDS = {
+    "name", "category", "description", "limit_date", "change_color_by_date",
+    "show_motivational_msg", "user_id", "version", "created_at", "updated_at"
+}
+MAX_CHECKLISTS_PAGE_SIZE = 100
+
+@app.get("/checklists", response_model=List[Checklist])
+async def get_user_checklists(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_CHECKLISTS_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_items: Literal["false", "summary", "full"] = "full",
+    fields: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    List the user's checklists.
+    With limit/cursor the checklists are paginated by most recent update and the
+    cursor for the next page is returned in the X-Next-Cursor header.
+    include_items picks between no items, completion counts or the full items,
+    and fields restricts the checklist fields returned (id is always included).
+    Responses carry a weak ETag; a matching If-None-Match returns 304.
+    """
+    selected_fields = None
+    if fields:
+        selected_fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown_fields = set(selected_fields) - CHECKLIST_FIELDS
+        if unknown_fields:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown_fields))}")
+    
+    # The version is read before the checklists, so the tag can only be older than the data
+    etag = checklists_etag(user_id, await get_checklists_version(user_id))
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
     
-    return response_data
+    # The summary counts are read from the checklist documents, so project them as well
+    storage_fields = selected_fields
+    if selected_fields is not None and include_items == "summary":
+        storage_fields = [*selected_fields, *ITEM_COUNT_FIELDS, "version"]
+    
+    # Get user's checklists, in a stable order when paginating
+    try:
+        checklist_records = await storage.checklists.list_for_user(
+            user_id,
+            limit=limit,
+            start_after=cursor,
+            fields=storage_fields,
+            newest_first=limit is not None or cursor is not None
+        )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    checklists = [
+        serialize_checklist(checklist_data['id'], checklist_data, selected_fields)
+        for checklist_data in checklist_records
+    ]
+    
+    headers = {"ETag": etag, "Cache-Control": CHECKLISTS_CACHE_CONTROL}
+    if limit is not None and len(checklists) == limit:
+        headers["X-Next-Cursor"] = checklists[-1]["id"]
+    
+    checklist_ids = [checklist['id'] for checklist in checklists]
+    if include_items == "full":
+        # Get the items of every checklist in a bounded number of queries
+        items_by_checklist = await storage.items.list_for_checklists(checklist_ids)
+        for checklist in checklists:
+            checklist['items'] = [serialize_item(item['id'], item) for item in sorted(items_by_checklist.get(checklist['id'], []), key=item_order)]
+    elif include_items == "summary":
+        counts_by_checklist = await load_item_counts(checklist_records, user_id)
+        for checklist in checklists:
+            checklist.update(counts_by_checklist[checklist['id']])
+    
+    return ORJSONBytesResponse(checklists, headers=headers)
 
-@app.get("/checklists", response_model=List[dict])
-async def get_user_checklists(current_user: dict = Depends(get_current_user)):
-    db = firebase_service.get_db()
+# Fields of the dashboard summary, all stored on the checklist document
+SUMMARY_FIELDS = ["name", "category", "limit_date"]
+
+@app.get("/checklists/summary", response_model=List[ChecklistSummary])
+async def get_checklists_summary(request: Request, user_id: str = Depends(get_current_user_id)):
+    """
+    Dashboard view of the user's checklists: name, category, limit date and
+    item counts, read from the checklist documents only (no item reads).
+    """
+    etag = checklists_etag(user_id, await get_checklists_version(user_id))
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
     
-    # Get user's checklists
-    checklists_ref = db.collection('checklists')
-    user_checklists = checklists_ref.where('user_id', '==', current_user['id']).stream()
+    checklist_records = await storage.checklists.list_for_user(
+        user_id, fields=[*SUMMARY_FIELDS, *ITEM_COUNT_FIELDS, "version"]
+    )
+    counts_by_checklist = await load_item_counts(checklist_records, user_id)
     
-    checklists = []
-    for checklist_doc in user_checklists:
-        checklist_data = checklist_doc.to_dict()
+    summaries = []
+    for checklist_data in checklist_records:
+        summary = serialize_checklist(checklist_data['id'], checklist_data, SUMMARY_FIELDS)
+        summary.update(counts_by_checklist[checklist_data['id']])
+        summaries.append(summary)
+    
+    return ORJSONBytesResponse(summaries, headers={"ETag": etag, "Cache-Control": CHECKLISTS_CACHE_CONTROL})
+
+# Checklists loaded per page while exporting; one batched items query serves each page
+EXPORT_PAGE_SIZE = 30
+
+async def export_checklists_ndjson(user_id: str):
+    """
+    Yield the user's checklists, with their items, as NDJSON lines.
+    Checklists are read page by page (ordered by id, which needs no composite
+    index), so memory stays bounded by a single page.
+    """
+    last_checklist_id = None
+    
+    while True:
+        checklist_records = await storage.checklists.list_for_user(
+            user_id, limit=EXPORT_PAGE_SIZE, start_after=last_checklist_id
+        )
+        if not checklist_records:
+            break
         
-        # Prepare response data with proper serialization
-        response_checklist = {
-            "id": checklist_doc.id,
-            "name": checklist_data.get("name"),
-            "category": checklist_data.get("category"),
-            "description": checklist_data.get("description"),
-            "limit_date": checklist_data.get("limit_date").isoformat() if checklist_data.get("limit_date") else None,
-            "change_color_by_date": bool(checklist_data.get("change_color_by_date", False)),
-            "show_motivational_msg": bool(checklist_data.get("show_motivational_msg", False)),
-            "user_id": checklist_data.get("user_id"),
-            "created_at": checklist_data.get("created_at").isoformat() if checklist_data.get("created_at") else None,
-            "updated_at": checklist_data.get("updated_at").isoformat() if checklist_data.get("updated_at") else None
-        }
+        items_by_checklist = await storage.items.list_for_checklists([checklist['id'] for checklist in checklist_records])
+        for checklist_data in checklist_records:
+            checklist = serialize_checklist(checklist_data['id'], checklist_data)
+            checklist['items'] = [serialize_item(item['id'], item) for item in sorted(items_by_checklist.get(checklist['id'], []), key=item_order)]
+            yield dumps(checklist) + b"\n"
         
-        # Get checklist items
-        items_ref = db.collection('checklist_items')
-        items_query = items_ref.where('checklist_id', '==', checklist_doc.id).stream()
+        if len(checklist_records) < EXPORT_PAGE_SIZE:
+            break
+        last_checklist_id = checklist_records[-1]['id']
+
+@app.get("/checklists/export")
+async def export_checklists(user_id: str = Depends(get_current_user_id)):
+    """Stream every checklist of the user, with its items, as NDJSON (one checklist per line)"""
+    return StreamingResponse(
+        export_checklists_ndjson(user_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="checklists.ndjson"'}
+    )
+
+# Upper bound for one NDJSON row, so a missing newline cannot buffer the whole upload
+MAX_IMPORT_LINE_BYTES = 1024 * 1024
+# Only the first errors are returned in detail; all of them are counted
+MAX_IMPORT_ERRORS = 100
+# Writes buffered before a chunk of rows is sent to storage
+IMPORT_FLUSH_WRITES = 500
+
+async def iter_ndjson_lines(request: Request):
+    """
+    Split a streamed request body into lines without buffering the whole body.
+    A line longer than MAX_IMPORT_LINE_BYTES is yielded as None and its bytes
+    are discarded up to the next newline, so the rows after it still import.
+    """
+    buffer = b""
+    skipping = False
+    async for chunk in request.stream():
+        buffer += chunk
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            if skipping:
+                # Tail of the oversized line, already reported
+                skipping = False
+                continue
+            yield line if len(line) <= MAX_IMPORT_LINE_BYTES else None
+        if len(buffer) > MAX_IMPORT_LINE_BYTES:
+            if not skipping:
+                yield None
+                skipping = True
+            buffer = b""
+    if buffer and not skipping:
+        yield buffer if len(buffer) <= MAX_IMPORT_LINE_BYTES else None
+
+@app.post("/checklists/import", response_model=dict)
+async def import_checklists(request: Request, user_id: str = Depends(get_current_user_id)):
+    """
+    Import checklists from a streamed NDJSON body, one checklist per line.
+    Each line holds the ChecklistCreate fields plus an optional "items" list of
+    ChecklistItemUpdate objects (the format produced by /checklists/export).
+    Rows are validated as they arrive and written in chunks; on Firestore a row
+    never spans two batches unless it alone exceeds the batch limit.
+    """
+    pending_rows = []
+    pending_writes = 0
+    created_checklists = 0
+    created_items = 0
+    failed_rows = 0
+    errors = []
+    line_number = 0
+    
+    async for line in iter_ndjson_lines(request):
+        line_number += 1
+        if line is None:
+            failed_rows += 1
+            if len(errors) < MAX_IMPORT_ERRORS:
+                errors.append({"line": line_number, "error": f"Line exceeds {MAX_IMPORT_LINE_BYTES} bytes"})
+            continue
+        if not line.strip():
+            continue
         
-        items = []
-        for item_doc in items_query:
-            item_data = item_doc.to_dict()
-            item_response = {
-                "id": item_doc.id,
-                "title": item_data.get("title"),
-                "completed": bool(item_data.get("completed", False)),
-                "description": item_data.get("description"),
-                "checklist_id": item_data.get("checklist_id"),
-                "created_at": item_data.get("created_at").isoformat() if item_data.get("created_at") else None,
-                "updated_at": item_data.get("updated_at").isoformat() if item_data.get("updated_at") else None
+        try:
+            row = orjson.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError("Row must be a JSON object")
+            checklist = ChecklistImportRow.model_validate(row)
+            items = checklist.items or []
+        except (ValueError, ValidationError) as e:
+            failed_rows += 1
+            if len(errors) < MAX_IMPORT_ERRORS:
+                errors.append({"line": line_number, "error": str(e)})
+            continue
+        
+        now = datetime.utcnow()
+        checklist_id = storage.checklists.new_id()
+        checklist_data = {
+            "name": checklist.name,
+            "category": checklist.category,
+            "description": checklist.description,
+            "limit_date": checklist.limit_date,
+            "change_color_by_date": bool(checklist.change_color_by_date),
+            "show_motivational_msg": bool(checklist.show_motivational_msg),
+            "user_id": user_id,
+            **count_items([item.model_dump() for item in items]),
+            "next_position": len(items),
+            "version": 0,
+            "created_at": now,
+            "updated_at": now
+        }
+        items_data = {
+            storage.items.new_id(): {
+                "title": item.title,
+                "description": item.description,
+                "completed": item.completed,
+                "checklist_id": checklist_id,
+                "position": position,
+                "created_at": now,
+                "updated_at": now
             }
-            items.append(item_response)
+            for position, item in enumerate(items)
+        }
+        
+        pending_rows.append((checklist_id, checklist_data, items_data))
+        pending_writes += 1 + len(items_data)
+        if pending_writes >= IMPORT_FLUSH_WRITES:
+            await storage.checklists.create_many_with_items(pending_rows)
+            await bump_checklists_version(user_id)
+            pending_rows = []
+            pending_writes = 0
         
-        response_checklist['items'] = items
-        checklists.append(response_checklist)
+        created_checklists += 1
+        created_items += len(items)
+    
+    if pending_rows:
+        await storage.checklists.create_many_with_items(pending_rows)
+        await bump_checklists_version(user_id)
     
-    return checklists
+    if created_checklists:
+        await event_broker.publish(user_id, "checklists.imported", {"created_checklists": created_checklists})
+    
+    return {
+        "message": "Checklists imported",
+        "created_checklists": created_checklists,
+        "created_items": created_items,
+        "failed_rows": failed_rows,
+        "errors": errors
+    }
 
-@app.get("/checklists/{checklist_id}", response_model=dict)
-async def get_checklist(checklist_id: str, current_user: dict = Depends(get_current_user)):
-    db = firebase_service.get_db()
+async def checklist_event_stream(user_id: str):
+    """Yield the user's checklist events as SSE messages, with heartbeats while idle"""
+    subscription = event_broker.subscribe(user_id)
+    try:
+        # Tells the client to load its state once; later changes arrive as events
+        yield b"event: ready\ndata: {}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=settings.events_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            yield b"id: %s\nevent: %s\ndata: %s\n\n" % (
+                event["id"].encode(), event["type"].encode(), dumps(event.get("data", {}))
+            )
+    finally:
+        event_broker.unsubscribe(subscription)
+
+# Scope of the short-lived tokens accepted by /checklists/events in the query string
+EVENTS_TOKEN_SCOPE = "events"
+
+@app.post("/checklists/events/token", response_model=dict)
+async def create_events_token(current_user: dict = Depends(get_current_user)):
+    """
+    Short-lived token for /checklists/events?token=..., since the browser
+    EventSource cannot send an Authorization header. It only opens the event
+    stream, and is checked when the stream connects, so request a new one
+    before every reconnect.
+    """
+    expires_delta = timedelta(seconds=settings.events_token_expire_seconds)
+    token = create_access_token(
+        data={
+            "sub": current_user['email'],
+            "uid": current_user['id'],
+            "ver": current_user.get('token_version', 0),
+            "scope": EVENTS_TOKEN_SCOPE
+        },
+        expires_delta=expires_delta
+    )
+    return {"token": token, "expires_in": settings.events_token_expire_seconds}
+
+async def get_events_user_id(
+    token: Optional[str] = Query(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> str:
+    """User of the event stream, from a bearer token or an events token in the query string"""
+    if token is None:
+        if credentials is None:
+            raise credentials_exception()
+        return await get_current_user_id(credentials)
+    
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        raise credentials_exception()
+    if payload.get("scope") != EVENTS_TOKEN_SCOPE or payload.get("sub") is None or payload.get("uid") is None:
+        raise credentials_exception()
     
+    token_data = TokenData(email=payload["sub"], user_id=payload["uid"], token_version=payload.get("ver"))
+    user_data = await load_token_user(token_data)
+    return user_data['id']
+
+@app.get("/checklists/events")
+async def checklist_events(user_id: str = Depends(get_events_user_id)):
+    """
+    Server-sent events with the user's checklist changes: checklist.created,
+    checklist.updated, checklist.deleted, items.replaced, items.patched and
+    checklists.imported. A resync event means events were dropped because the
+    client fell behind, or could not be published, and its state should be reloaded.
+    Authenticates with the bearer token or, for EventSource, ?token= from
+    POST /checklists/events/token.
+    """
+    return StreamingResponse(
+        checklist_event_stream(user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/checklists/{checklist_id}", response_model=Checklist)
+async def get_checklist(checklist_id: str, request: Request, user_id: str = Depends(get_current_user_id)):
     # Get checklist
-    checklist_ref = db.collection('checklists').document(checklist_id)
-    checklist_doc = checklist_ref.get()
+    checklist_data = await storage.checklists.get(checklist_id)
     
-    if not checklist_doc.exists:
+    if checklist_data is None:
         raise HTTPException(status_code=404, detail="Checklist not found")
     
-    checklist_data = checklist_doc.to_dict()
-    
     # Verify ownership
-    if checklist_data['user_id'] != current_user['id']:
+    if checklist_data['user_id'] != user_id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Prepare response data with proper serialization
-    response_checklist = {
-        "id": checklist_doc.id,
-        "name": checklist_data.get("name"),
-        "category": checklist_data.get("category"),
-        "description": checklist_data.get("description"),
-        "limit_date": checklist_data.get("limit_date").isoformat() if checklist_data.get("limit_date") else None,
-        "change_color_by_date": bool(checklist_data.get("change_color_by_date", False)),
-        "show_motivational_msg": bool(checklist_data.get("show_motivational_msg", False)),
-        "user_id": checklist_data.get("user_id"),
-        "created_at": checklist_data.get("created_at").isoformat() if checklist_data.get("created_at") else None,
-        "updated_at": checklist_data.get("updated_at").isoformat() if checklist_data.get("updated_at") else None
-    }
+    # Compared only once the checklist is known to be the user's, so a matching
+    # tag never answers 304 for a missing or foreign checklist
+    etag = checklist_etag(checklist_data.get('version'))
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    
+    response_checklist = serialize_checklist(checklist_id, checklist_data)
     
     # Get checklist items
-    items_ref = db.collection('checklist_items')
-    items_query = items_ref.where('checklist_id', '==', checklist_id).stream()
-    
-    items = []
-    for item_doc in items_query:
-        item_data = item_doc.to_dict()
-        item_response = {
-            "id": item_doc.id,
-            "title": item_data.get("title"),
-            "completed": bool(item_data.get("completed", False)),
-            "description": item_data.get("description"),
-            "checklist_id": item_data.get("checklist_id"),
-            "created_at": item_data.get("created_at").isoformat() if item_data.get("created_at") else None,
-            "updated_at": item_data.get("updated_at").isoformat() if item_data.get("updated_at") else None
-        }
-        items.append(item_response)
+    items = await storage.items.list_for_checklist(checklist_id)
     
-    response_checklist['items'] = items
+    response_checklist['items'] = [serialize_item(item['id'], item) for item in sorted(items, key=item_order)]
     
-    return response_checklist
+    return ORJSONBytesResponse(response_checklist, headers={"ETag": etag, "Cache-Control": CHECKLISTS_CACHE_CONTROL})
+
+# Attempts of a write without an expected version before it gives up with 409
+WRITE_CONFLICT_RETRIES = 3
+
+def checklist_conflict_exception():
+    return HTTPException(status_code=409, detail="Checklist was modified by another request")
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """
+    Checklist version required by an If-Match header, which holds the ETag of
+    GET /checklists/{id} ("3", a bare 3 is accepted too); None when absent or *
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().strip('"'))
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="If-Match must hold the ETag returned by GET /checklists/{id}"
+        )
 
-@app.put("/checklists/{checklist_id}", response_model=dict)
-async def update_checklist(checklist_id: str, checklist_update: ChecklistUpdate, current_user: dict = Depends(get_current_user)):
-    db = firebase_service.get_db()
+@app.put("/checklists/{checklist_id}", response_model=ChecklistResponse)
+async def update_checklist(
+    checklist_id: str,
+    checklist_update: ChecklistUpdate,
+    if_match: Optional[str] = Header(None),
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Update the provided checklist fields.
+    With If-Match set to the checklist ETag ("<version>"), returns 409 when the checklist
+    changed since that version.
+    """
+    expected_version = parse_if_match(if_match)
     
     # Get checklist
-    checklist_ref = db.collection('checklists').document(checklist_id)
-    checklist_doc = checklist_ref.get()
+    checklist_data = await storage.checklists.get(checklist_id)
     
-    if not checklist_doc.exists:
+    if checklist_data is None:
         raise HTTPException(status_code=404, detail="Checklist not found")
     
-    checklist_data = checklist_doc.to_dict()
-    
     # Verify ownership
-    if checklist_data['user_id'] != current_user['id']:
+    if checklist_data['user_id'] != user_id:
         raise HTTPException(status_code=403, detail="Access denied")
     
     # Update only provided fields
@@ -399,131 +996,393 @@ async def update_checklist(checklist_id: str, checklist_update: ChecklistUpdate,
     
     update_data['updated_at'] = datetime.utcnow()
     
-    # Update in Firestore
-    checklist_ref.update(update_data)
-    
-    # Return updated checklist with proper serialization
-    updated_doc = checklist_ref.get()
-    updated_data = updated_doc.to_dict()
-    
-    response_data = {
-        "id": checklist_id,
-        "name": updated_data.get("name"),
-        "category": updated_data.get("category"),
-        "description": updated_data.get("description"),
-        "limit_date": updated_data.get("limit_date").isoformat() if updated_data.get("limit_date") else None,
-        "change_color_by_date": bool(updated_data.get("change_color_by_date", False)),
-        "show_motivational_msg": bool(updated_data.get("show_motivational_msg", False)),
-        "user_id": updated_data.get("user_id"),
-        "created_at": updated_data.get("created_at").isoformat() if updated_data.get("created_at") else None,
-        "updated_at": updated_data.get("updated_at").isoformat() if updated_data.get("updated_at") else None
-    }
+    # Update in storage, compared and set against the expected version
+    try:
+        update_data['version'] = await storage.checklists.update_with_version(checklist_id, update_data, expected_version)
+    except VersionConflictError:
+        raise checklist_conflict_exception()
     
-    return response_data
+    # Return updated checklist
+    response_checklist = serialize_checklist(checklist_id, {**checklist_data, **update_data})
+    await checklists_changed(user_id, "checklist.updated", response_checklist)
+    return ORJSONBytesResponse(response_checklist, headers={"ETag": checklist_etag(update_data['version'])})
+
+# Background deletions kept in memory so clients can poll their status
+MAX_TRACKED_DELETION_JOBS = 1000
+deletion_jobs: Dict[str, dict] = OrderedDict()
+
+async def run_deletion_job(job_id: str, checklist_id: str):
+    job = deletion_jobs[job_id]
+    job["status"] = "running"
+    try:
+        job["deleted_items"] = await storage.checklists.delete_with_items(checklist_id)
+        await checklists_changed(job["user_id"], "checklist.deleted", {"id": checklist_id})
+        job["status"] = "completed"
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+    job["finished_at"] = datetime.utcnow()
 
 @app.delete("/checklists/{checklist_id}")
-async def delete_checklist(checklist_id: str, current_user: dict = Depends(get_current_user)):
-    db = firebase_service.get_db()
-    
+async def delete_checklist(checklist_id: str, background_tasks: BackgroundTasks, background: bool = False, user_id: str = Depends(get_current_user_id)):
+    """
+    Delete a checklist and all of its items.
+    With background=true the deletion runs after the response is sent and the
+    request returns 202 with a job id to poll at /checklists/deletions/{job_id}.
+    """
     # Get checklist
-    checklist_ref = db.collection('checklists').document(checklist_id)
-    checklist_doc = checklist_ref.get()
+    checklist_data = await storage.checklists.get(checklist_id)
     
-    if not checklist_doc.exists:
+    if checklist_data is None:
         raise HTTPException(status_code=404, detail="Checklist not found")
     
-    checklist_data = checklist_doc.to_dict()
-    
     # Verify ownership
-    if checklist_data['user_id'] != current_user['id']:
+    if checklist_data['user_id'] != user_id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Delete all checklist items first
-    items_ref = db.collection('checklist_items')
-    items_query = items_ref.where('checklist_id', '==', checklist_id).stream()
-    
-    for item_doc in items_query:
-        item_doc.reference.delete()
+    if background:
+        job_id = uuid.uuid4().hex
+        deletion_jobs[job_id] = {
+            "job_id": job_id,
+            "checklist_id": checklist_id,
+            "user_id": user_id,
+            "status": "pending",
+            "deleted_items": None,
+            "created_at": datetime.utcnow(),
+            "finished_at": None
+        }
+        while len(deletion_jobs) > MAX_TRACKED_DELETION_JOBS:
+            deletion_jobs.popitem(last=False)
+        
+        background_tasks.add_task(run_deletion_job, job_id, checklist_id)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={
+                "message": "Checklist deletion started",
+                "job_id": job_id,
+                "status_url": f"/checklists/deletions/{job_id}"
+            }
+        )
     
-    # Delete checklist
-    checklist_ref.delete()
+    await storage.checklists.delete_with_items(checklist_id)
+    await checklists_changed(user_id, "checklist.deleted", {"id": checklist_id})
     
     return {"message": "Checklist deleted successfully"}
 
-@app.put("/checklists/{checklist_id}/items", response_model=dict)
-async def update_checklist_items(checklist_id: str, items_data: ChecklistItemsBulkUpdate, current_user: dict = Depends(get_current_user)):
+@app.get("/checklists/deletions/{job_id}", response_model=dict)
+async def get_deletion_job(job_id: str, user_id: str = Depends(get_current_user_id)):
+    job = deletion_jobs.get(job_id)
+    if job is None or job["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail="Deletion job not found")
+    
+    return {key: value for key, value in job.items() if key != "user_id"}
+
+@app.put("/checklists/{checklist_id}/items", response_model=ChecklistItemsUpdateResponse)
+async def update_checklist_items(
+    checklist_id: str,
+    items_data: ChecklistItemsBulkUpdate,
+    if_match: Optional[str] = Header(None),
+    user_id: str = Depends(get_current_user_id)
+):
     """
     Update all items in a checklist in bulk.
     Creates new items (items without id) and updates existing items (items with id).
     Removes items that are not in the request.
+    The diff is written only if the checklist is still at the version it was
+    computed from: with If-Match a conflict returns 409, otherwise the diff is
+    recomputed on the latest items.
     """
-    db = firebase_service.get_db()
-    
-    # Verify checklist exists and user owns it
-    checklist_ref = db.collection('checklists').document(checklist_id)
-    checklist_doc = checklist_ref.get()
-    
-    if not checklist_doc.exists:
-        raise HTTPException(status_code=404, detail="Checklist not found")
+    expected_version = parse_if_match(if_match)
     
-    checklist_data = checklist_doc.to_dict()
-    if checklist_data['user_id'] != current_user['id']:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    # Get current items
-    current_items_query = db.collection('checklist_items').where('checklist_id', '==', checklist_id)
-    current_items_docs = current_items_query.stream()
-    current_items_ids = {doc.id for doc in current_items_docs}
-    
-    # Track which items we're keeping/updating
-    items_to_keep = set()
-    updated_items = []
-    
-    # Process each item from the request
-    for item in items_data.items:
-        item_data = {
-            "title": item.title,
-            "description": item.description,
-            "completed": item.completed,
-            "checklist_id": checklist_id,
-            "updated_at": datetime.utcnow()
-        }
+    for attempt in range(WRITE_CONFLICT_RETRIES):
+        # Verify checklist exists and user owns it
+        checklist_data = await storage.checklists.get(checklist_id)
         
-        if item.id and item.id in current_items_ids:
-            # Update existing item
-            item_ref = db.collection('checklist_items').document(item.id)
-            item_ref.update(item_data)
-            items_to_keep.add(item.id)
-            
-            # Get updated data
-            updated_doc = item_ref.get()
-            updated_item_data = updated_doc.to_dict()
-            updated_item_data['id'] = item.id
-            updated_items.append(updated_item_data)
-            
-        else:
-            # Create new item
-            item_data["created_at"] = datetime.utcnow()
-            items_ref = db.collection('checklist_items')
-            doc_ref = items_ref.add(item_data)
-            new_item_id = doc_ref[1].id
+        if checklist_data is None:
+            raise HTTPException(status_code=404, detail="Checklist not found")
+        
+        if checklist_data['user_id'] != user_id:
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        current_version = checklist_data.get('version', 0)
+        if expected_version is not None and expected_version != current_version:
+            raise checklist_conflict_exception()
+        
+        # Get current items
+        current_items = {item['id']: item for item in await storage.items.list_for_checklist(checklist_id)}
+        current_items_ids = set(current_items)
+        
+        # Track which items we're keeping/updating
+        items_to_keep = set()
+        updated_items = []
+        items_to_create = {}
+        items_to_update = {}
+        
+        # Process each item from the request; the list order becomes the item positions
+        for position, item in enumerate(items_data.items):
+            item_data = {
+                "title": item.title,
+                "description": item.description,
+                "completed": item.completed,
+                "checklist_id": checklist_id,
+                "position": position,
+                "updated_at": datetime.utcnow()
+            }
             
-            item_data['id'] = new_item_id
-            updated_items.append(item_data)
-            items_to_keep.add(new_item_id)
+            if item.id and item.id in current_items_ids:
+                # Update existing item, building the response from the data we already have
+                items_to_update[item.id] = item_data
+                items_to_keep.add(item.id)
+                
+                updated_items.append(serialize_item(item.id, {**current_items[item.id], **item_data}))
+                
+            else:
+                # Create new item with a client-side generated id
+                item_data["created_at"] = datetime.utcnow()
+                new_item_id = storage.items.new_id()
+                items_to_create[new_item_id] = item_data
+                
+                updated_items.append(serialize_item(new_item_id, item_data))
+                items_to_keep.add(new_item_id)
+        
+        # Delete items that are not in the new list
+        items_to_delete = current_items_ids - items_to_keep
+        
+        # The checklist counts are written with the item changes, from the resulting item list
+        item_counts = count_items([*items_to_update.values(), *items_to_create.values()])
+        try:
+            version = await storage.items.apply_changes(
+                items_to_create, items_to_update, items_to_delete,
+                checklist_id=checklist_id,
+                checklist_update={**item_counts, "next_position": len(items_data.items)},
+                expected_version=current_version
+            )
+            break
+        except VersionConflictError:
+            if expected_version is not None or attempt == WRITE_CONFLICT_RETRIES - 1:
+                raise checklist_conflict_exception()
     
-    # Delete items that are not in the new list
-    items_to_delete = current_items_ids - items_to_keep
-    for item_id in items_to_delete:
-        db.collection('checklist_items').document(item_id).delete()
+    await checklists_changed(user_id, "items.replaced", {
+        "checklist_id": checklist_id,
+        "version": version,
+        "items": updated_items,
+        **item_counts
+    })
     
-    return {
+    return ORJSONBytesResponse({
         "message": "Checklist items updated successfully",
+        "version": version,
         "items": updated_items,
-        "created_count": len([item for item in items_data.items if not item.id or item.id not in current_items_ids]),
-        "updated_count": len([item for item in items_data.items if item.id and item.id in current_items_ids]),
+        "created_count": len(items_to_create),
+        "updated_count": len(items_to_update),
         "deleted_count": len(items_to_delete)
+    }, headers={"ETag": checklist_etag(version)})
+
+async def load_next_position(checklist_data: dict) -> int:
+    """
+    Position for the next added item. Checklists written before the counter
+    was stored get it from their items (past the highest position in use).
+    """
+    if 'next_position' in checklist_data:
+        return checklist_data['next_position']
+    
+    items = await storage.items.list_for_checklist(checklist_data['id'])
+    positions = [item['position'] for item in items if item.get('position') is not None]
+    # Moved items can sit between whole positions
+    return max(len(items), int(max(positions, default=-1)) + 1)
+
+def plan_item_operations(
+    checklist_id: str,
+    operations: list,
+    existing_items: Dict[str, dict],
+    counts: dict,
+    next_position: Optional[int]
+):
+    """
+    Replay the patch operations over the referenced items.
+    Returns the creates, updates and deletes to write, the resulting items, the
+    checklist counts after the patch and the position for the next added item.
+    Added items go after every existing position. A move places one item halfway
+    between its new neighbours, so it writes only that item. A reorder must list
+    every existing item and renumbers them from 0, followed by the items added
+    in the same patch, so positions never collide.
+    """
+    now = datetime.utcnow()
+    items = {item_id: dict(item_data) for item_id, item_data in existing_items.items()}
+    creates = {}
+    updates = {}
+    deletes = set()
+    
+    def get_item(item_id: str) -> dict:
+        if item_id in deletes:
+            raise HTTPException(status_code=400, detail=f"Item {item_id} was deleted by an earlier operation")
+        return items[item_id]
+    
+    def get_position(item_id: str):
+        position = get_item(item_id).get("position")
+        if position is None:
+            raise HTTPException(status_code=400, detail=f"Item {item_id} has no position yet (send a reorder)")
+        return position
+    
+    def change_item(item_id: str, changes: dict):
+        get_item(item_id).update(changes)
+        updates.setdefault(item_id, {}).update(changes)
+    
+    for operation in operations:
+        if operation.op == "add":
+            item_id = storage.items.new_id()
+            items[item_id] = creates[item_id] = {
+                "title": operation.title,
+                "description": operation.description,
+                "completed": operation.completed,
+                "checklist_id": checklist_id,
+                "position": next_position,
+                "created_at": now,
+                "updated_at": now
+            }
+            next_position += 1
+        elif operation.op == "update":
+            changes = {
+                field: value for field, value in operation.model_dump(exclude_unset=True, exclude={"op", "id"}).items()
+                if value is not None or field == "description"
+            }
+            change_item(operation.id, {**changes, "updated_at": now})
+        elif operation.op == "delete":
+            get_item(operation.id)
+            updates.pop(operation.id, None)
+            deletes.add(operation.id)
+        elif operation.op == "move":
+            get_item(operation.id)
+            if operation.before is None:
+                position = next_position
+                next_position += 1
+            elif operation.after is None:
+                position = get_position(operation.before) - 1
+            else:
+                lower = get_position(operation.after)
+                upper = get_position(operation.before)
+                position = (lower + upper) / 2
+                if not lower < position < upper:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="The after item must come before the before item, with room between them (send a reorder)"
+                    )
+            change_item(operation.id, {"position": position, "updated_at": now})
+        elif operation.op == "reorder":
+            # Items added by this patch have no id the client knows; they follow the listed ones
+            items_count = counts["items_count"] - len(deletes)
+            if len(set(operation.ids)) != len(operation.ids) or len(operation.ids) != items_count:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Reorder must list every existing item of the checklist exactly once"
+                )
+            for position, item_id in enumerate(operation.ids):
+                change_item(item_id, {"position": position, "updated_at": now})
+            added_ids = sorted(creates, key=lambda item_id: creates[item_id]["position"])
+            for position, item_id in enumerate(added_ids, len(operation.ids)):
+                creates[item_id]["position"] = position
+            next_position = len(operation.ids) + len(creates)
+    
+    completed_delta = sum(1 for item_data in creates.values() if item_data["completed"])
+    completed_delta -= sum(1 for item_id in deletes if existing_items[item_id].get("completed"))
+    completed_delta += sum(
+        bool(items[item_id].get("completed")) - bool(existing_items[item_id].get("completed"))
+        for item_id in updates
+    )
+    item_counts = {
+        "items_count": counts["items_count"] + len(creates) - len(deletes),
+        "completed_count": counts["completed_count"] + completed_delta
     }
+    changed_items = {item_id: items[item_id] for item_id in [*updates, *creates]}
+    return creates, updates, deletes, changed_items, item_counts, next_position
+
+@app.patch("/checklists/{checklist_id}/items", response_model=ChecklistItemsPatchResponse)
+async def patch_checklist_items(
+    checklist_id: str,
+    patch: ChecklistItemsPatch,
+    if_match: Optional[str] = Header(None),
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Apply a list of item operations (add, update, delete, move, reorder) to a checklist.
+    Only the items referenced by the operations are read and written, together
+    with the checklist counts and version, in one atomic write.
+    With expected_version (or If-Match) the patch returns 409 if the checklist
+    changed since that version; without it, the patch is replayed on the latest version.
+    """
+    expected_version = patch.expected_version if patch.expected_version is not None else parse_if_match(if_match)
+    
+    referenced_ids = set()
+    appends = False
+    for operation in patch.operations:
+        if operation.op == "add":
+            appends = True
+        elif operation.op in ("update", "delete"):
+            referenced_ids.add(operation.id)
+        elif operation.op == "move":
+            referenced_ids.update(item_id for item_id in (operation.id, operation.after, operation.before) if item_id is not None)
+            appends = appends or operation.before is None
+        elif operation.op == "reorder":
+            referenced_ids.update(operation.ids)
+    
+    for attempt in range(WRITE_CONFLICT_RETRIES):
+        # Verify checklist exists and user owns it
+        checklist_data = await storage.checklists.get(checklist_id)
+        
+        if checklist_data is None:
+            raise HTTPException(status_code=404, detail="Checklist not found")
+        
+        if checklist_data['user_id'] != user_id:
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        current_version = checklist_data.get('version', 0)
+        if expected_version is not None and expected_version != current_version:
+            raise checklist_conflict_exception()
+        
+        # Not stored back here: the patch writes the counts with the item changes
+        counts = (await load_item_counts([checklist_data]))[checklist_id]
+        existing_items = {
+            item_id: item_data for item_id, item_data in (await storage.items.get_many(list(referenced_ids))).items()
+            if item_data.get('checklist_id') == checklist_id
+        }
+        missing_ids = referenced_ids - set(existing_items)
+        if missing_ids:
+            raise HTTPException(status_code=404, detail=f"Items not found: {', '.join(sorted(missing_ids))}")
+        
+        # The stored counter is only needed (and backfilled) when items are added or moved last
+        next_position = await load_next_position(checklist_data) if appends else checklist_data.get('next_position')
+        creates, updates, deletes, changed_items, item_counts, next_position = plan_item_operations(
+            checklist_id, patch.operations, existing_items, counts, next_position
+        )
+        checklist_update = dict(item_counts)
+        if next_position is not None:
+            checklist_update["next_position"] = next_position
+        try:
+            version = await storage.items.apply_changes(
+                creates, updates, deletes,
+                checklist_id=checklist_id, checklist_update=checklist_update, expected_version=current_version
+            )
+            break
+        except VersionConflictError:
+            if expected_version is not None or attempt == WRITE_CONFLICT_RETRIES - 1:
+                raise checklist_conflict_exception()
+    
+    patched_items = [serialize_item(item_id, item_data) for item_id, item_data in changed_items.items()]
+    await checklists_changed(user_id, "items.patched", {
+        "checklist_id": checklist_id,
+        "version": version,
+        "items": patched_items,
+        "deleted_ids": sorted(deletes),
+        **item_counts
+    })
+    
+    return ORJSONBytesResponse({
+        "message": "Checklist items patched successfully",
+        "version": version,
+        "items": patched_items,
+        "deleted_ids": sorted(deletes),
+        **item_counts
+    }, headers={"ETag": checklist_etag(version)})
 
 if __name__ == "__main__":
     import uvicorn
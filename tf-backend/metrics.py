@@ -0,0 +1,279 @@
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from tracing import tracer
+
+# Metrics are only updated from the event loop thread, so no locking is needed
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+STORAGE_CALLS_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+def escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_labels(labelnames: Tuple[str, ...], labelvalues: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label_value(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    metric_type = None
+    
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple, object] = {}
+    
+    def label_key(self, labels: dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+    
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+
+class Counter(Metric):
+    metric_type = "counter"
+    
+    def inc(self, amount: float = 1, **labels):
+        key = self.label_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+    
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, value in self.values.items():
+            lines.append(f"{self.name}{format_labels(self.labelnames, key)} {format_value(value)}")
+        return lines
+
+class Gauge(Counter):
+    metric_type = "gauge"
+    
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+    
+    def set(self, value: float, **labels):
+        self.values[self.label_key(labels)] = value
+
+class Histogram(Metric):
+    metric_type = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+    
+    def observe(self, value: float, **labels):
+        key = self.label_key(labels)
+        state = self.values.get(key)
+        if state is None:
+            state = self.values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for index, upper_bound in enumerate(self.buckets):
+            if value <= upper_bound:
+                state["buckets"][index] += 1
+                break
+        state["sum"] += value
+        state["count"] += 1
+    
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, state in self.values.items():
+            cumulative = 0
+            for upper_bound, count in zip(self.buckets, state["buckets"]):
+                cumulative += count
+                labels = format_labels(self.labelnames, key, f'le="{format_value(upper_bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], Iterable[Metric]]] = []
+    
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+    
+    def register_collector(self, collector: Callable[[], Iterable[Metric]]):
+        """Register a callable producing metrics whose values are read at scrape time"""
+        self.collectors.append(collector)
+    
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by method, route and status code", ("method", "route", "status")
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response is sent", ("method", "route")
+))
+http_requests_in_progress = registry.register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served", ("method",)
+))
+http_request_storage_calls = registry.register(Histogram(
+    "http_request_storage_calls", "Storage calls made while serving one HTTP request", ("method", "route"),
+    buckets=STORAGE_CALLS_BUCKETS
+))
+http_request_storage_duration_seconds = registry.register(Histogram(
+    "http_request_storage_duration_seconds", "Time spent in storage calls while serving one HTTP request", ("method", "route")
+))
+storage_operations_total = registry.register(Counter(
+    "storage_operations_total", "Storage repository calls", ("backend", "repository", "operation")
+))
+storage_operation_duration_seconds = registry.register(Histogram(
+    "storage_operation_duration_seconds", "Storage repository call latency", ("backend", "repository", "operation")
+))
+
+class RequestStorageStats:
+    """Storage calls of the request currently being served"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+current_request_stats: ContextVar[Optional[RequestStorageStats]] = ContextVar("current_request_stats", default=None)
+
+def record_storage_call(backend: str, repository: str, operation: str, seconds: float):
+    storage_operations_total.inc(backend=backend, repository=repository, operation=operation)
+    storage_operation_duration_seconds.observe(seconds, backend=backend, repository=repository, operation=operation)
+    request_stats = current_request_stats.get()
+    if request_stats is not None:
+        request_stats.calls += 1
+        request_stats.seconds += seconds
+
+# Storage collection behind each repository, used as the span's db.collection
+REPOSITORY_COLLECTIONS = {
+    "users": "users",
+    "checklists": "checklists",
+    "items": "checklist_items",
+    "refresh_tokens": "refresh_tokens"
+}
+
+def count_documents(operation: str, args: tuple, result) -> int:
+    """Number of documents read or written by a repository call"""
+    if operation == "apply_changes":
+        return sum(len(changes) for changes in args[:3])
+    if operation == "create_many_with_items":
+        return sum(1 + len(items) for _, _, items in args[0])
+    if operation == "delete_with_items":
+        return result + 1
+    if operation == "rotate":
+        return 2 if result else 0
+    if operation == "revoke_for_user":
+        return result
+    if operation == "count_for_checklists":
+        # Item documents read to count them, not the checklists they belong to
+        return sum(counts["items_count"] for counts in result.values())
+    if operation in ("create", "update", "increment", "revoke", "update_with_version", "update_if_version"):
+        return 1
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict) and "id" in result:
+        return 1
+    if isinstance(result, dict):
+        # Results grouped by checklist id
+        return sum(len(value) if isinstance(value, list) else 1 for value in result.values())
+    return 1
+
+class InstrumentedRepository:
+    """Proxy that times and traces every coroutine method of a storage repository"""
+    
+    def __init__(self, repository, backend: str, name: str):
+        self.repository = repository
+        self.backend = backend
+        self.name = name
+        self.collection = REPOSITORY_COLLECTIONS.get(name, name)
+    
+    def __getattr__(self, attribute):
+        value = getattr(self.repository, attribute)
+        if not inspect.iscoroutinefunction(value):
+            return value
+        
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            with tracer.start_span(
+                f"storage.{self.name}.{attribute}",
+                **{"db.system": self.backend, "db.collection": self.collection, "db.operation": attribute}
+            ) as span:
+                try:
+                    result = await value(*args, **kwargs)
+                    span.set_attribute("db.document_count", count_documents(attribute, args, result))
+                    return result
+                finally:
+                    record_storage_call(self.backend, self.name, attribute, time.perf_counter() - start)
+        return timed
+
+def instrument_storage(storage):
+    """Wrap the repositories of a Storage so their calls are counted and timed"""
+    storage.users = InstrumentedRepository(storage.users, storage.name, "users")
+    storage.checklists = InstrumentedRepository(storage.checklists, storage.name, "checklists")
+    storage.items = InstrumentedRepository(storage.items, storage.name, "items")
+    storage.refresh_tokens = InstrumentedRepository(storage.refresh_tokens, storage.name, "refresh_tokens")
+    return storage
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, status counts, in-flight
+    requests and the storage calls made by each request.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        method = scope["method"]
+        request_stats = RequestStorageStats()
+        token = current_request_stats.set(request_stats)
+        start = time.perf_counter()
+        status_code = 500
+        finished = False
+        
+        def finish():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            # The router stores the matched route in the shared scope
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            http_requests_in_progress.dec(method=method)
+            http_requests_total.inc(method=method, route=route, status=status_code)
+            http_request_duration_seconds.observe(time.perf_counter() - start, method=method, route=route)
+            http_request_storage_calls.observe(request_stats.calls, method=method, route=route)
+            http_request_storage_duration_seconds.observe(request_stats.seconds, method=method, route=route)
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+            # Background tasks run after the last body chunk and are not part of the request latency
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+        
+        http_requests_in_progress.inc(method=method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
+            current_request_stats.reset(token)
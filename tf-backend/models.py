@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, model_validator
+from typing import Annotated, Optional, List, Literal, Union
 from datetime import datetime
 
 # User models
@@ -29,6 +29,7 @@ class UserResponse(BaseModel):
     phone: Optional[str] = None
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
 
 # Checklist models
 class ChecklistItemBase(BaseModel):
@@ -51,12 +52,59 @@ class ChecklistItemsBulkUpdate(BaseModel):
 class ChecklistItem(ChecklistItemBase):
     id: str
     checklist_id: str
+    position: Optional[Union[int, float]] = None
     created_at: datetime
     updated_at: datetime
     
     class Config:
         from_attributes = True
 
+# Item patch operations, applied in order by PATCH /checklists/{id}/items
+class ItemAddOperation(BaseModel):
+    op: Literal["add"]
+    title: str
+    completed: bool = False
+    description: Optional[str] = None
+
+class ItemUpdateOperation(BaseModel):
+    op: Literal["update"]
+    id: str
+    title: Optional[str] = None
+    completed: Optional[bool] = None
+    description: Optional[str] = None
+
+class ItemDeleteOperation(BaseModel):
+    op: Literal["delete"]
+    id: str
+
+class ItemMoveOperation(BaseModel):
+    op: Literal["move"]
+    id: str
+    # The item's new neighbours: after=None moves it first, before=None moves it last
+    after: Optional[str] = None
+    before: Optional[str] = None
+    
+    @model_validator(mode="after")
+    def check_neighbours(self):
+        if self.after is None and self.before is None:
+            raise ValueError("move needs after or before")
+        if self.id in (self.after, self.before):
+            raise ValueError("An item cannot be moved next to itself")
+        return self
+
+class ItemReorderOperation(BaseModel):
+    op: Literal["reorder"]
+    ids: List[str] = Field(min_length=1)  # Every existing item of the checklist, in its new order from position 0
+
+ItemOperation = Annotated[
+    Union[ItemAddOperation, ItemUpdateOperation, ItemDeleteOperation, ItemMoveOperation, ItemReorderOperation],
+    Field(discriminator="op")
+]
+
+class ChecklistItemsPatch(BaseModel):
+    operations: List[ItemOperation] = Field(min_length=1, max_length=100)
+    expected_version: Optional[int] = None
+
 class ChecklistBase(BaseModel):
     name: str
     category: Optional[str] = None
@@ -68,6 +116,10 @@ class ChecklistBase(BaseModel):
 class ChecklistCreate(ChecklistBase):
     pass
 
+class ChecklistImportRow(ChecklistCreate):
+    """One line of the NDJSON accepted by /checklists/import"""
+    items: Optional[List[ChecklistItemUpdate]] = None
+
 class ChecklistUpdate(BaseModel):
     name: Optional[str] = None
     category: Optional[str] = None
@@ -76,23 +128,56 @@ class ChecklistUpdate(BaseModel):
     change_color_by_date: Optional[bool] = None
     show_motivational_msg: Optional[bool] = None
 
-class Checklist(ChecklistBase):
+class ChecklistResponse(ChecklistBase):
     id: str
     user_id: str
-    items: List[ChecklistItem] = []
+    version: int = 0
     created_at: datetime
     updated_at: datetime
+
+class Checklist(ChecklistResponse):
+    items: List[ChecklistItem] = []
     
     class Config:
         from_attributes = True
 
+class ChecklistSummary(BaseModel):
+    id: str
+    name: str
+    category: Optional[str] = None
+    limit_date: Optional[datetime] = None
+    items_count: int
+    completed_count: int
+
+class ChecklistItemsPatchResponse(BaseModel):
+    message: str
+    version: int
+    items: List[ChecklistItem]
+    deleted_ids: List[str]
+    items_count: int
+    completed_count: int
+
+class ChecklistItemsUpdateResponse(BaseModel):
+    message: str
+    version: int
+    items: List[ChecklistItem]
+    created_count: int
+    updated_count: int
+    deleted_count: int
+
 # Token models
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    user_id: Optional[str] = None
+    token_version: Optional[int] = None
 
 class UserUpdate(BaseModel):
     name: Optional[str] = None
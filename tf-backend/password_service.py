@@ -0,0 +1,101 @@
+import asyncio
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from passlib.context import CryptContext
+from config import settings
+
+class PasswordPoolSaturatedError(Exception):
+    """Raised when the password worker pool has no room for another job"""
+    pass
+
+def create_crypt_context(
+    schemes: List[str],
+    bcrypt_rounds: int,
+    argon2_time_cost: int,
+    argon2_memory_cost: int,
+    argon2_parallelism: int
+) -> CryptContext:
+    """
+    Context hashing with the first scheme. Hashes in the other schemes, or made
+    with weaker parameters, still verify and are reported by needs_update.
+    The costs are only minimums: stronger hashes are never flagged, so lowering
+    a cost does not downgrade the stored hashes.
+    """
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        bcrypt__default_rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        argon2__type="ID",
+        argon2__default_rounds=argon2_time_cost,
+        argon2__min_rounds=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism
+    )
+
+def argon2_needs_update(handler, hashed_password: str) -> bool:
+    """
+    Whether an argon2 hash is weaker than the configured handler. passlib flags
+    any memory cost other than the configured one, stronger ones included.
+    """
+    parsed = handler.from_string(hashed_password)
+    return (
+        parsed.type != handler.type
+        or parsed.version < handler.max_version
+        or parsed.memory_cost < handler.memory_cost
+        or parsed.rounds < handler.default_rounds
+    )
+
+class PasswordService:
+    def __init__(self, max_workers: int, queue_limit: int, pwd_context: CryptContext, dummy_hash_scheme: str):
+        self.pwd_context = pwd_context
+        # Hash of a random password, verified when a login names an unknown user so that
+        # the response takes as long as for a wrong password stored in dummy_hash_scheme
+        self.dummy_hash = self.pwd_context.handler(dummy_hash_scheme).hash(secrets.token_urlsafe(32))
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password")
+        # Jobs running on the pool plus jobs waiting for a free worker
+        self.max_pending = max_workers + queue_limit
+        self.pending = 0
+    
+    async def run(self, func, *args):
+        """Run a blocking hashing function on the worker pool without blocking the event loop"""
+        if self.pending >= self.max_pending:
+            raise PasswordPoolSaturatedError()
+        
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+    
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Check a password against its hash on the worker pool"""
+        return await self.run(self.pwd_context.verify, plain_password, hashed_password)
+    
+    def needs_update(self, hashed_password: str) -> bool:
+        """Whether the hash uses a deprecated scheme or weaker parameters than configured (no hashing involved)"""
+        scheme = self.pwd_context.identify(hashed_password)
+        if scheme == "argon2" and scheme == self.pwd_context.default_scheme():
+            return argon2_needs_update(self.pwd_context.handler(scheme), hashed_password)
+        return self.pwd_context.needs_update(hashed_password)
+    
+    async def hash(self, password: str) -> str:
+        """Hash a password on the worker pool"""
+        return await self.run(self.pwd_context.hash, password)
+
+# Global password service instance
+password_service = PasswordService(
+    max_workers=settings.password_hash_workers,
+    queue_limit=settings.password_hash_queue_limit,
+    pwd_context=create_crypt_context(
+        settings.password_schemes,
+        settings.bcrypt_rounds,
+        settings.argon2_time_cost,
+        settings.argon2_memory_cost,
+        settings.argon2_parallelism
+    ),
+    # During a migration most stored hashes still use the oldest scheme
+    dummy_hash_scheme=settings.password_dummy_hash_scheme or settings.password_schemes[-1]
+)
@@ -0,0 +1,88 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+from config import settings
+from metrics import registry, Counter
+
+login_attempts_rejected_total = registry.register(Counter(
+    "login_attempts_rejected_total", "Login attempts rejected by the rate limiter, by limit", ("scope",)
+))
+
+class RateLimitStore(ABC):
+    """
+    Token buckets keyed by string. The in-memory store is per process; a store
+    shared by all workers (Redis, for instance) only has to implement these two
+    operations atomically.
+    """
+    
+    @abstractmethod
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> float:
+        """Take a token from the bucket; return 0 if one was available, else the seconds until one is"""
+    
+    @abstractmethod
+    async def reset(self, key: str):
+        """Refill the bucket"""
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Process-local buckets, the least recently used evicted beyond max_keys"""
+    
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+    
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self.buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+        
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / refill_per_second
+        
+        self.buckets[key] = (tokens, now)
+        while len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return retry_after
+    
+    async def reset(self, key: str):
+        self.buckets.pop(key, None)
+
+class LoginRateLimiter:
+    """
+    Token buckets per client IP and per email, checked before a login touches
+    storage or bcrypt. Every attempt takes a token from both buckets; a
+    successful login refills the email bucket.
+    """
+    
+    def __init__(self, store: RateLimitStore):
+        self.store = store
+    
+    async def check(self, ip: Optional[str], email: str) -> float:
+        """Return 0 if the attempt may proceed, else the seconds to wait before retrying"""
+        if not settings.login_rate_limit_enabled:
+            return 0.0
+        
+        if ip is not None:
+            retry_after = await self.store.take(
+                f"ip:{ip}", settings.login_ip_capacity, settings.login_ip_refill_per_minute / 60
+            )
+            if retry_after:
+                login_attempts_rejected_total.inc(scope="ip")
+                return retry_after
+        
+        retry_after = await self.store.take(
+            f"email:{email.lower()}", settings.login_email_capacity, settings.login_email_refill_per_minute / 60
+        )
+        if retry_after:
+            login_attempts_rejected_total.inc(scope="email")
+        return retry_after
+    
+    async def login_succeeded(self, email: str):
+        if settings.login_rate_limit_enabled:
+            await self.store.reset(f"email:{email.lower()}")
+
+# Global login limiter; swap the store for a shared one when running several workers
+login_rate_limiter = LoginRateLimiter(MemoryRateLimitStore(settings.login_rate_limit_max_keys))
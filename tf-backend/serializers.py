@@ -0,0 +1,61 @@
+from datetime import datetime
+from typing import Any, Iterable, Optional
+import orjson
+from starlette.responses import Response
+
+CHECKLIST_KEYS = (
+    "name", "category", "description", "limit_date", "change_color_by_date",
+    "show_motivational_msg", "user_id", "version", "created_at", "updated_at"
+)
+CHECKLIST_FLAGS = ("change_color_by_date", "show_motivational_msg")
+
+def encode_default(value: Any):
+    """Fallback for types orjson does not encode natively, such as datetime subclasses returned by Firestore"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=encode_default)
+
+class ORJSONBytesResponse(Response):
+    """
+    JSON response encoded in a single orjson pass.
+    Routes return it directly so the content skips response_model validation
+    and jsonable_encoder; datetimes are encoded as ISO 8601 by orjson itself.
+    """
+    media_type = "application/json"
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def serialize_checklist(checklist_id: str, checklist_data: dict, fields: Optional[Iterable[str]] = None) -> dict:
+    """Convert a checklist document into its response form (without items), optionally limited to fields"""
+    response_checklist = {"id": checklist_id}
+    for key in CHECKLIST_KEYS if fields is None else fields:
+        response_checklist[key] = checklist_data.get(key)
+    for key in CHECKLIST_FLAGS:
+        if key in response_checklist:
+            response_checklist[key] = bool(response_checklist[key])
+    if "version" in response_checklist:
+        # Checklists written before versioning are at version 0
+        response_checklist["version"] = response_checklist["version"] or 0
+    return response_checklist
+
+def item_order(item_data: dict):
+    """Sort key placing items by position, with items never positioned last"""
+    position = item_data.get("position")
+    return (position is None, position or 0)
+
+def serialize_item(item_id: str, item_data: dict) -> dict:
+    """Convert a checklist item document into its response form"""
+    return {
+        "id": item_id,
+        "title": item_data.get("title"),
+        "completed": bool(item_data.get("completed", False)),
+        "description": item_data.get("description"),
+        "checklist_id": item_data.get("checklist_id"),
+        "position": item_data.get("position"),
+        "created_at": item_data.get("created_at"),
+        "updated_at": item_data.get("updated_at")
+    }
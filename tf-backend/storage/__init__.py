@@ -0,0 +1,27 @@
+from config import settings
+from metrics import instrument_storage
+from storage.base import (
+    Storage, UserRepository, ChecklistRepository, ItemRepository, RefreshTokenRepository,
+    InvalidCursorError, VersionConflictError
+)
+
+def create_storage(backend: str = None) -> Storage:
+    """Build the storage backend selected by settings.storage_backend"""
+    backend = backend or settings.storage_backend
+    
+    if backend == "firestore":
+        # Imported lazily so the other backends run without firebase-admin credentials
+        from firebase_service import firebase_service
+        from storage.firestore_backend import create_firestore_storage
+        return create_firestore_storage(firebase_service)
+    if backend == "memory":
+        from storage.memory_backend import create_memory_storage
+        return create_memory_storage()
+    if backend == "sqlite":
+        from storage.sqlite_backend import create_sqlite_storage
+        return create_sqlite_storage(settings.sqlite_path)
+    
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+# Global storage instance, with every repository call counted and timed
+storage = instrument_storage(create_storage())
@@ -0,0 +1,181 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor does not point to one of the user's checklists"""
+    pass
+
+class VersionConflictError(Exception):
+    """Raised when a checklist no longer has the version a write was based on"""
+    
+    def __init__(self, current_version: Optional[int]):
+        super().__init__(f"Checklist is at version {current_version}")
+        self.current_version = current_version
+
+class UserRepository(ABC):
+    @abstractmethod
+    def new_id(self) -> str:
+        """Generate an id for a user that has not been written yet"""
+    
+    @abstractmethod
+    async def get(self, user_id: str) -> Optional[dict]:
+        """Return the user (including its id) or None"""
+    
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        """Return the user registered with this email or None"""
+    
+    @abstractmethod
+    async def create(self, data: dict) -> str:
+        """Store a new user and return its id"""
+    
+    @abstractmethod
+    async def update(self, user_id: str, data: dict):
+        """Merge the given fields into an existing user"""
+    
+    @abstractmethod
+    async def increment(self, user_id: str, field: str, amount: int = 1):
+        """Atomically add amount to a numeric field of the user (a missing field counts as 0)"""
+
+class ChecklistRepository(ABC):
+    @abstractmethod
+    def new_id(self) -> str:
+        """Generate an id for a checklist that has not been written yet"""
+    
+    @abstractmethod
+    async def get(self, checklist_id: str) -> Optional[dict]:
+        """Return the checklist (including its id) or None"""
+    
+    @abstractmethod
+    async def create(self, data: dict) -> str:
+        """Store a new checklist and return its id"""
+    
+    @abstractmethod
+    async def update_with_version(self, checklist_id: str, data: dict, expected_version: Optional[int] = None) -> int:
+        """
+        Merge the given fields into the checklist and increment its version atomically,
+        returning the new version. With expected_version, VersionConflictError is raised
+        and nothing is written when the checklist is at another version.
+        """
+    
+    @abstractmethod
+    async def update_if_version(self, checklist_id: str, data: dict, expected_version: int):
+        """
+        Merge the given fields into the checklist, leaving its version as is, if it is
+        still at expected_version; otherwise raise VersionConflictError and write nothing.
+        For derived fields (such as backfilled counts) that must not invalidate ETags.
+        """
+    
+    @abstractmethod
+    async def list_for_user(
+        self,
+        user_id: str,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        newest_first: bool = False
+    ) -> List[dict]:
+        """
+        List the user's checklists ordered by id, or by most recent update when
+        newest_first is set. start_after is the id of the last checklist of the
+        previous page, and fields limits the returned fields (id is always set).
+        """
+    
+    @abstractmethod
+    async def delete_with_items(self, checklist_id: str) -> int:
+        """
+        Delete a checklist and all of its items, returning the number of deleted items.
+        If the deletion is interrupted, the item counts of the checklist still match its remaining items.
+        """
+    
+    @abstractmethod
+    async def create_many_with_items(self, rows: List[Tuple[str, dict, Dict[str, dict]]]):
+        """Store (checklist_id, checklist_data, {item_id: item_data}) rows created with new_id()"""
+
+class ItemRepository(ABC):
+    @abstractmethod
+    def new_id(self) -> str:
+        """Generate an id for an item that has not been written yet"""
+    
+    @abstractmethod
+    async def list_for_checklist(self, checklist_id: str) -> List[dict]:
+        """Return the items (including their ids) of one checklist"""
+    
+    @abstractmethod
+    async def list_for_checklists(self, checklist_ids: List[str]) -> Dict[str, List[dict]]:
+        """Return the items of several checklists grouped by checklist id"""
+    
+    @abstractmethod
+    async def count_for_checklists(self, checklist_ids: List[str]) -> Dict[str, dict]:
+        """Return {"items_count", "completed_count"} for several checklists"""
+    
+    @abstractmethod
+    async def get_many(self, item_ids: List[str]) -> Dict[str, dict]:
+        """Return the existing items among item_ids, keyed by id"""
+    
+    @abstractmethod
+    async def apply_changes(
+        self,
+        creates: Dict[str, dict],
+        updates: Dict[str, dict],
+        deletes: Iterable[str],
+        checklist_id: Optional[str] = None,
+        checklist_update: Optional[dict] = None,
+        expected_version: Optional[int] = None
+    ) -> Optional[int]:
+        """
+        Create, update and delete items in as few round trips as the backend allows.
+        With checklist_id, checklist_update (such as the denormalized item counts)
+        is merged into the checklist and its version is incremented in the same
+        atomic write as the last item changes, and the new version is returned.
+        With expected_version, VersionConflictError is raised and nothing is
+        written when the checklist is at another version (a missing version is 0).
+        Backends that cap the size of an atomic write may split larger diffs, but
+        then lock the checklist after the version check, so concurrent versioned
+        writes conflict instead of interleaving with the remaining changes.
+        """
+
+class RefreshTokenRepository(ABC):
+    """Refresh tokens keyed by the SHA-256 hash of the token, never by the token itself"""
+    
+    @abstractmethod
+    async def get(self, token_hash: str) -> Optional[dict]:
+        """Return the token record (including its id, the hash) or None"""
+    
+    @abstractmethod
+    async def create(self, token_hash: str, data: dict):
+        """Store a new token record under its hash"""
+    
+    @abstractmethod
+    async def rotate(self, token_hash: str, new_token_hash: str, new_data: dict, revoked_at: datetime) -> bool:
+        """
+        Atomically revoke token_hash, recording new_token_hash as its replacement,
+        and store new_data under new_token_hash. Returns False and writes nothing
+        when the token is missing or already revoked, so a token rotates only once.
+        """
+    
+    @abstractmethod
+    async def revoke(self, token_hash: str, revoked_at: datetime):
+        """Revoke one token (a missing or already revoked token is left as is)"""
+    
+    @abstractmethod
+    async def revoke_for_user(self, user_id: str, revoked_at: datetime) -> int:
+        """Revoke every active token of the user, returning the number of revoked tokens"""
+
+class Storage:
+    """Groups the repositories of one storage backend"""
+    
+    def __init__(
+        self,
+        name: str,
+        users: UserRepository,
+        checklists: ChecklistRepository,
+        items: ItemRepository,
+        refresh_tokens: RefreshTokenRepository
+    ):
+        self.name = name
+        self.users = users
+        self.checklists = checklists
+        self.items = items
+        self.refresh_tokens = refresh_tokens
@@ -0,0 +1,366 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from firebase_admin import firestore
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from storage.base import (
+    Storage, UserRepository, ChecklistRepository, ItemRepository, RefreshTokenRepository,
+    InvalidCursorError, VersionConflictError
+)
+
+# Firestore caps the number of values accepted by an 'in' filter
+FIRESTORE_IN_QUERY_LIMIT = 30
+# Firestore rejects write batches with more than 500 operations
+FIRESTORE_BATCH_LIMIT = 500
+# How long an item write spanning several batches keeps its checklist locked;
+# the lock of an interrupted write is released when it expires
+PENDING_WRITE_LEASE = timedelta(seconds=60)
+
+def document_to_dict(doc) -> dict:
+    data = doc.to_dict()
+    data['id'] = doc.id
+    return data
+
+def empty_counts() -> dict:
+    return {"items_count": 0, "completed_count": 0}
+
+def add_write(batch, operation: str, doc_ref, data):
+    """Queue one write on a WriteBatch or transaction"""
+    if operation == "set":
+        batch.set(doc_ref, data)
+    elif operation == "update":
+        batch.update(doc_ref, data)
+    elif operation == "delete":
+        batch.delete(doc_ref)
+
+def snapshot_version(snapshot) -> Optional[int]:
+    if not snapshot.exists:
+        return None
+    return snapshot.to_dict().get('version', 0)
+
+def checked_version(snapshot, expected_version: Optional[int], write_id: Optional[str] = None) -> int:
+    """
+    Return the version of a checklist read in a transaction. VersionConflictError is
+    raised when the checklist is missing, at another version than expected_version,
+    or locked by a pending write other than write_id.
+    """
+    current_version = snapshot_version(snapshot)
+    if current_version is None or (expected_version is not None and current_version != expected_version):
+        raise VersionConflictError(current_version)
+    
+    pending_write = snapshot.to_dict().get('pending_write')
+    if write_id is not None:
+        # The lock must still be ours, or another writer took over after it expired
+        if not pending_write or pending_write.get('id') != write_id:
+            raise VersionConflictError(current_version)
+    elif pending_write:
+        expires_at = pending_write['expires_at']
+        if expires_at.tzinfo is not None:
+            expires_at = expires_at.replace(tzinfo=None)
+        if expires_at > datetime.utcnow():
+            raise VersionConflictError(current_version)
+    return current_version
+
+async def commit_writes(db, writes: List[tuple]):
+    """
+    Commit (operation, document_ref, data) writes with WriteBatch, chunked at the
+    Firestore batch limit. Each chunk is atomic, so diffs up to the limit are
+    applied all-or-nothing in a single RPC.
+    """
+    for start in range(0, len(writes), FIRESTORE_BATCH_LIMIT):
+        batch = db.batch()
+        for operation, doc_ref, data in writes[start:start + FIRESTORE_BATCH_LIMIT]:
+            add_write(batch, operation, doc_ref, data)
+        await batch.commit()
+
+class FirestoreRepository:
+    collection_name = None
+    
+    def __init__(self, firebase_service):
+        self.firebase_service = firebase_service
+    
+    @property
+    def db(self):
+        return self.firebase_service.get_db()
+    
+    @property
+    def collection(self):
+        return self.db.collection(self.collection_name)
+    
+    def new_id(self) -> str:
+        return self.collection.document().id
+    
+    async def get(self, document_id: str) -> Optional[dict]:
+        doc = await self.collection.document(document_id).get()
+        if not doc.exists:
+            return None
+        return document_to_dict(doc)
+    
+    async def create(self, data: dict) -> str:
+        _, doc_ref = await self.collection.add(data)
+        return doc_ref.id
+
+class FirestoreUserRepository(FirestoreRepository, UserRepository):
+    collection_name = 'users'
+    
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        user_query = self.collection.where('email', '==', email).limit(1)
+        async for user_doc in user_query.stream():
+            return document_to_dict(user_doc)
+        return None
+    
+    async def update(self, user_id: str, data: dict):
+        await self.collection.document(user_id).update(data)
+    
+    async def increment(self, user_id: str, field: str, amount: int = 1):
+        await self.collection.document(user_id).update({field: firestore.Increment(amount)})
+
+class FirestoreChecklistRepository(FirestoreRepository, ChecklistRepository):
+    collection_name = 'checklists'
+    
+    async def update_with_version(self, checklist_id: str, data: dict, expected_version: Optional[int] = None) -> int:
+        checklist_ref = self.collection.document(checklist_id)
+        
+        @firestore.async_transactional
+        async def update(transaction):
+            current_version = checked_version(await checklist_ref.get(transaction=transaction), expected_version)
+            transaction.update(checklist_ref, {**data, "version": current_version + 1})
+            return current_version + 1
+        
+        return await update(self.db.transaction())
+    
+    async def update_if_version(self, checklist_id: str, data: dict, expected_version: int):
+        checklist_ref = self.collection.document(checklist_id)
+        
+        @firestore.async_transactional
+        async def update(transaction):
+            checked_version(await checklist_ref.get(transaction=transaction), expected_version)
+            transaction.update(checklist_ref, data)
+        
+        await update(self.db.transaction())
+    
+    async def list_for_user(
+        self,
+        user_id: str,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        newest_first: bool = False
+    ) -> List[dict]:
+        checklists_query = self.collection.where('user_id', '==', user_id)
+        
+        if newest_first:
+            # Needs the composite index on (user_id, updated_at desc) from firestore.indexes.json; ties break on the document id
+            checklists_query = checklists_query.order_by('updated_at', direction=firestore.Query.DESCENDING)
+        else:
+            checklists_query = checklists_query.order_by(FieldPath.document_id())
+        
+        if start_after is not None:
+            cursor_doc = await self.collection.document(start_after).get()
+            if not cursor_doc.exists or cursor_doc.to_dict().get('user_id') != user_id:
+                raise InvalidCursorError(start_after)
+            checklists_query = checklists_query.start_after(cursor_doc)
+        if limit is not None:
+            checklists_query = checklists_query.limit(limit)
+        if fields is not None:
+            checklists_query = checklists_query.select(fields)
+        
+        return [document_to_dict(checklist_doc) async for checklist_doc in checklists_query.stream()]
+    
+    async def delete_with_items(self, checklist_id: str) -> int:
+        db = self.db
+        checklist_ref = self.collection.document(checklist_id)
+        items_query = db.collection('checklist_items').where('checklist_id', '==', checklist_id).select(['completed'])
+        item_docs = [item_doc async for item_doc in items_query.stream()]
+        
+        # Every chunk but the last also decrements the checklist counts by the items it deletes,
+        # so an interrupted deletion leaves consistent counts; the checklist goes in the last chunk,
+        # so a failure never leaves orphaned items behind
+        chunk_size = FIRESTORE_BATCH_LIMIT - 1
+        for start in range(0, len(item_docs), chunk_size):
+            chunk = item_docs[start:start + chunk_size]
+            writes = [("delete", item_doc.reference, None) for item_doc in chunk]
+            if start + chunk_size < len(item_docs):
+                completed = sum(1 for item_doc in chunk if item_doc.to_dict().get('completed'))
+                writes.append(("update", checklist_ref, {
+                    "items_count": firestore.Increment(-len(chunk)),
+                    "completed_count": firestore.Increment(-completed)
+                }))
+            else:
+                writes.append(("delete", checklist_ref, None))
+            await commit_writes(db, writes)
+        
+        if not item_docs:
+            await checklist_ref.delete()
+        return len(item_docs)
+    
+    async def create_many_with_items(self, rows: List[Tuple[str, dict, Dict[str, dict]]]):
+        db = self.db
+        items_ref = db.collection('checklist_items')
+        writes = []
+        
+        for checklist_id, checklist_data, items in rows:
+            row_writes = [("set", self.collection.document(checklist_id), checklist_data)]
+            row_writes.extend(("set", items_ref.document(item_id), item_data) for item_id, item_data in items.items())
+            
+            # Flush before a row that would not fit in the current batch, so rows stay atomic
+            if len(writes) + len(row_writes) > FIRESTORE_BATCH_LIMIT:
+                await commit_writes(db, writes)
+                writes = []
+            writes.extend(row_writes)
+        
+        await commit_writes(db, writes)
+
+class FirestoreItemRepository(FirestoreRepository, ItemRepository):
+    collection_name = 'checklist_items'
+    
+    async def list_for_checklist(self, checklist_id: str) -> List[dict]:
+        items_query = self.collection.where('checklist_id', '==', checklist_id)
+        return [document_to_dict(item_doc) async for item_doc in items_query.stream()]
+    
+    async def list_for_checklists(self, checklist_ids: List[str]) -> Dict[str, List[dict]]:
+        """
+        Load the items of several checklists with chunked 'in' queries, so the
+        number of queries grows with len(checklist_ids) / FIRESTORE_IN_QUERY_LIMIT.
+        """
+        items_by_checklist = {checklist_id: [] for checklist_id in checklist_ids}
+        
+        for start in range(0, len(checklist_ids), FIRESTORE_IN_QUERY_LIMIT):
+            chunk = checklist_ids[start:start + FIRESTORE_IN_QUERY_LIMIT]
+            items_query = self.collection.where('checklist_id', 'in', chunk)
+            
+            async for item_doc in items_query.stream():
+                item_data = document_to_dict(item_doc)
+                items_by_checklist.setdefault(item_data.get('checklist_id'), []).append(item_data)
+        
+        return items_by_checklist
+    
+    async def count_for_checklists(self, checklist_ids: List[str]) -> Dict[str, dict]:
+        """Same chunked 'in' queries as list_for_checklists, projected to the fields the counts need"""
+        counts_by_checklist = {checklist_id: empty_counts() for checklist_id in checklist_ids}
+        
+        for start in range(0, len(checklist_ids), FIRESTORE_IN_QUERY_LIMIT):
+            chunk = checklist_ids[start:start + FIRESTORE_IN_QUERY_LIMIT]
+            items_query = self.collection.where('checklist_id', 'in', chunk).select(['checklist_id', 'completed'])
+            
+            async for item_doc in items_query.stream():
+                item_data = item_doc.to_dict()
+                counts = counts_by_checklist.setdefault(item_data.get('checklist_id'), empty_counts())
+                counts["items_count"] += 1
+                if item_data.get('completed'):
+                    counts["completed_count"] += 1
+        
+        return counts_by_checklist
+    
+    async def get_many(self, item_ids: List[str]) -> Dict[str, dict]:
+        if not item_ids:
+            # Skip the BatchGetDocuments round trip of a patch that only adds items
+            return {}
+        item_refs = [self.collection.document(item_id) for item_id in item_ids]
+        return {item_doc.id: document_to_dict(item_doc) async for item_doc in self.db.get_all(item_refs) if item_doc.exists}
+    
+    async def apply_changes(
+        self,
+        creates: Dict[str, dict],
+        updates: Dict[str, dict],
+        deletes: Iterable[str],
+        checklist_id: Optional[str] = None,
+        checklist_update: Optional[dict] = None,
+        expected_version: Optional[int] = None
+    ) -> Optional[int]:
+        db = self.db
+        writes = []
+        writes.extend(("update", self.collection.document(item_id), data) for item_id, data in updates.items())
+        writes.extend(("set", self.collection.document(item_id), data) for item_id, data in creates.items())
+        writes.extend(("delete", self.collection.document(item_id), None) for item_id in deletes)
+        if checklist_id is None:
+            await commit_writes(db, writes)
+            return None
+        
+        checklist_ref = db.collection('checklists').document(checklist_id)
+        
+        # A transaction holds at most one batch of writes. Larger diffs first lock the
+        # checklist (checking and bumping its version), commit their first item writes
+        # in batches, then commit the last writes and release the lock in one
+        # transaction; other versioned writes conflict while the lock is held
+        split = max(0, len(writes) - (FIRESTORE_BATCH_LIMIT - 1))
+        write_id = None
+        if split:
+            write_id = uuid.uuid4().hex
+            
+            @firestore.async_transactional
+            async def lock(transaction):
+                current_version = checked_version(await checklist_ref.get(transaction=transaction), expected_version)
+                transaction.update(checklist_ref, {
+                    "pending_write": {"id": write_id, "expires_at": datetime.utcnow() + PENDING_WRITE_LEASE},
+                    "version": current_version + 1
+                })
+                return current_version + 1
+            
+            expected_version = await lock(db.transaction())
+            try:
+                await commit_writes(db, writes[:split])
+            except Exception:
+                await checklist_ref.update({"pending_write": None})
+                raise
+        
+        @firestore.async_transactional
+        async def commit_last_writes(transaction):
+            current_version = checked_version(await checklist_ref.get(transaction=transaction), expected_version, write_id)
+            for operation, doc_ref, data in writes[split:]:
+                add_write(transaction, operation, doc_ref, data)
+            checklist_data = {**(checklist_update or {}), "version": current_version + 1}
+            if write_id is not None:
+                checklist_data["pending_write"] = None
+            transaction.update(checklist_ref, checklist_data)
+            return current_version + 1
+        
+        return await commit_last_writes(db.transaction())
+
+class FirestoreRefreshTokenRepository(FirestoreRepository, RefreshTokenRepository):
+    # Expired tokens are removed by a TTL policy on expires_at
+    collection_name = 'refresh_tokens'
+    
+    async def create(self, token_hash: str, data: dict):
+        await self.collection.document(token_hash).set(data)
+    
+    async def rotate(self, token_hash: str, new_token_hash: str, new_data: dict, revoked_at: datetime) -> bool:
+        token_ref = self.collection.document(token_hash)
+        
+        @firestore.async_transactional
+        async def rotate(transaction):
+            snapshot = await token_ref.get(transaction=transaction)
+            if not snapshot.exists or snapshot.to_dict().get('revoked_at') is not None:
+                return False
+            transaction.update(token_ref, {"revoked_at": revoked_at, "replaced_by": new_token_hash})
+            transaction.set(self.collection.document(new_token_hash), new_data)
+            return True
+        
+        return await rotate(self.db.transaction())
+    
+    async def revoke(self, token_hash: str, revoked_at: datetime):
+        token_ref = self.collection.document(token_hash)
+        
+        @firestore.async_transactional
+        async def revoke(transaction):
+            snapshot = await token_ref.get(transaction=transaction)
+            if snapshot.exists and snapshot.to_dict().get('revoked_at') is None:
+                transaction.update(token_ref, {"revoked_at": revoked_at})
+        
+        await revoke(self.db.transaction())
+    
+    async def revoke_for_user(self, user_id: str, revoked_at: datetime) -> int:
+        tokens_query = self.collection.where('user_id', '==', user_id).where('revoked_at', '==', None)
+        writes = [("update", token_doc.reference, {"revoked_at": revoked_at}) async for token_doc in tokens_query.stream()]
+        await commit_writes(self.db, writes)
+        return len(writes)
+
+def create_firestore_storage(firebase_service) -> Storage:
+    return Storage(
+        name="firestore",
+        users=FirestoreUserRepository(firebase_service),
+        checklists=FirestoreChecklistRepository(firebase_service),
+        items=FirestoreItemRepository(firebase_service),
+        refresh_tokens=FirestoreRefreshTokenRepository(firebase_service)
+    )
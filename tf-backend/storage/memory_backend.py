@@ -0,0 +1,268 @@
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from storage.base import (
+    Storage, UserRepository, ChecklistRepository, ItemRepository, RefreshTokenRepository,
+    InvalidCursorError, VersionConflictError
+)
+
+# Repository methods never await while touching the shared dicts, so every
+# operation is atomic with respect to the other requests on the event loop.
+
+def new_document_id() -> str:
+    return uuid.uuid4().hex[:20]
+
+def empty_counts() -> dict:
+    return {"items_count": 0, "completed_count": 0}
+
+class MemoryDatabase:
+    """Process-local tables plus the secondary indexes the queries need"""
+    
+    def __init__(self):
+        self.users: Dict[str, dict] = {}
+        self.user_ids_by_email: Dict[str, str] = {}
+        self.checklists: Dict[str, dict] = {}
+        self.checklist_ids_by_user: Dict[str, Dict[str, None]] = defaultdict(dict)
+        self.items: Dict[str, dict] = {}
+        self.item_ids_by_checklist: Dict[str, Dict[str, None]] = defaultdict(dict)
+        self.refresh_tokens: Dict[str, dict] = {}
+        self.refresh_token_hashes_by_user: Dict[str, Dict[str, None]] = defaultdict(dict)
+    
+    def put_checklist(self, checklist_id: str, data: dict):
+        self.checklists[checklist_id] = dict(data)
+        self.checklist_ids_by_user[data.get('user_id')][checklist_id] = None
+    
+    def put_item(self, item_id: str, data: dict):
+        self.items[item_id] = dict(data)
+        self.item_ids_by_checklist[data.get('checklist_id')][item_id] = None
+    
+    def delete_item(self, item_id: str):
+        item = self.items.pop(item_id, None)
+        if item is not None:
+            self.item_ids_by_checklist[item.get('checklist_id')].pop(item_id, None)
+
+def copy_record(record_id: str, record: dict) -> dict:
+    data = dict(record)
+    data['id'] = record_id
+    return data
+
+class MemoryUserRepository(UserRepository):
+    def __init__(self, database: MemoryDatabase):
+        self.database = database
+    
+    def new_id(self) -> str:
+        return new_document_id()
+    
+    async def get(self, user_id: str) -> Optional[dict]:
+        user = self.database.users.get(user_id)
+        return copy_record(user_id, user) if user is not None else None
+    
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        user_id = self.database.user_ids_by_email.get(email)
+        return await self.get(user_id) if user_id is not None else None
+    
+    async def create(self, data: dict) -> str:
+        user_id = self.new_id()
+        self.database.users[user_id] = dict(data)
+        self.database.user_ids_by_email[data['email']] = user_id
+        return user_id
+    
+    async def update(self, user_id: str, data: dict):
+        user = self.database.users[user_id]
+        if 'email' in data and data['email'] != user.get('email'):
+            self.database.user_ids_by_email.pop(user.get('email'), None)
+            self.database.user_ids_by_email[data['email']] = user_id
+        user.update(data)
+    
+    async def increment(self, user_id: str, field: str, amount: int = 1):
+        user = self.database.users[user_id]
+        user[field] = user.get(field, 0) + amount
+
+class MemoryChecklistRepository(ChecklistRepository):
+    def __init__(self, database: MemoryDatabase):
+        self.database = database
+    
+    def new_id(self) -> str:
+        return new_document_id()
+    
+    async def get(self, checklist_id: str) -> Optional[dict]:
+        checklist = self.database.checklists.get(checklist_id)
+        return copy_record(checklist_id, checklist) if checklist is not None else None
+    
+    async def create(self, data: dict) -> str:
+        checklist_id = self.new_id()
+        self.database.put_checklist(checklist_id, data)
+        return checklist_id
+    
+    async def update_with_version(self, checklist_id: str, data: dict, expected_version: Optional[int] = None) -> int:
+        checklist = self.database.checklists.get(checklist_id)
+        current_version = checklist.get('version', 0) if checklist is not None else None
+        if current_version is None or (expected_version is not None and current_version != expected_version):
+            raise VersionConflictError(current_version)
+        checklist.update(data)
+        checklist['version'] = current_version + 1
+        return checklist['version']
+    
+    async def update_if_version(self, checklist_id: str, data: dict, expected_version: int):
+        checklist = self.database.checklists.get(checklist_id)
+        current_version = checklist.get('version', 0) if checklist is not None else None
+        if current_version != expected_version:
+            raise VersionConflictError(current_version)
+        checklist.update(data)
+    
+    async def list_for_user(
+        self,
+        user_id: str,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        newest_first: bool = False
+    ) -> List[dict]:
+        checklists = self.database.checklists
+        checklist_ids = list(self.database.checklist_ids_by_user.get(user_id, ()))
+        
+        if newest_first:
+            sort_key = lambda checklist_id: (checklists[checklist_id].get('updated_at'), checklist_id)
+        else:
+            sort_key = lambda checklist_id: checklist_id
+        checklist_ids.sort(key=sort_key, reverse=newest_first)
+        
+        if start_after is not None:
+            cursor = checklists.get(start_after)
+            if cursor is None or cursor.get('user_id') != user_id:
+                raise InvalidCursorError(start_after)
+            cursor_key = sort_key(start_after)
+            if newest_first:
+                checklist_ids = [checklist_id for checklist_id in checklist_ids if sort_key(checklist_id) < cursor_key]
+            else:
+                checklist_ids = [checklist_id for checklist_id in checklist_ids if sort_key(checklist_id) > cursor_key]
+        if limit is not None:
+            checklist_ids = checklist_ids[:limit]
+        
+        result = []
+        for checklist_id in checklist_ids:
+            checklist = checklists[checklist_id]
+            if fields is not None:
+                checklist = {field: checklist[field] for field in fields if field in checklist}
+            result.append(copy_record(checklist_id, checklist))
+        return result
+    
+    async def delete_with_items(self, checklist_id: str) -> int:
+        checklist = self.database.checklists.pop(checklist_id, None)
+        if checklist is not None:
+            self.database.checklist_ids_by_user[checklist.get('user_id')].pop(checklist_id, None)
+        
+        item_ids = list(self.database.item_ids_by_checklist.pop(checklist_id, ()))
+        for item_id in item_ids:
+            self.database.items.pop(item_id, None)
+        return len(item_ids)
+    
+    async def create_many_with_items(self, rows: List[Tuple[str, dict, Dict[str, dict]]]):
+        for checklist_id, checklist_data, items in rows:
+            self.database.put_checklist(checklist_id, checklist_data)
+            for item_id, item_data in items.items():
+                self.database.put_item(item_id, item_data)
+
+class MemoryItemRepository(ItemRepository):
+    def __init__(self, database: MemoryDatabase):
+        self.database = database
+    
+    def new_id(self) -> str:
+        return new_document_id()
+    
+    async def list_for_checklist(self, checklist_id: str) -> List[dict]:
+        items = self.database.items
+        return [copy_record(item_id, items[item_id]) for item_id in self.database.item_ids_by_checklist.get(checklist_id, ())]
+    
+    async def list_for_checklists(self, checklist_ids: List[str]) -> Dict[str, List[dict]]:
+        return {checklist_id: await self.list_for_checklist(checklist_id) for checklist_id in checklist_ids}
+    
+    async def count_for_checklists(self, checklist_ids: List[str]) -> Dict[str, dict]:
+        items = self.database.items
+        counts_by_checklist = {}
+        for checklist_id in checklist_ids:
+            counts = empty_counts()
+            for item_id in self.database.item_ids_by_checklist.get(checklist_id, ()):
+                counts["items_count"] += 1
+                if items[item_id].get('completed'):
+                    counts["completed_count"] += 1
+            counts_by_checklist[checklist_id] = counts
+        return counts_by_checklist
+    
+    async def get_many(self, item_ids: List[str]) -> Dict[str, dict]:
+        items = self.database.items
+        return {item_id: copy_record(item_id, items[item_id]) for item_id in item_ids if item_id in items}
+    
+    async def apply_changes(
+        self,
+        creates: Dict[str, dict],
+        updates: Dict[str, dict],
+        deletes: Iterable[str],
+        checklist_id: Optional[str] = None,
+        checklist_update: Optional[dict] = None,
+        expected_version: Optional[int] = None
+    ) -> Optional[int]:
+        if checklist_id is not None:
+            checklist = self.database.checklists.get(checklist_id)
+            current_version = checklist.get('version', 0) if checklist is not None else None
+            if current_version is None or (expected_version is not None and current_version != expected_version):
+                raise VersionConflictError(current_version)
+        
+        for item_id, data in updates.items():
+            self.database.items[item_id].update(data)
+        for item_id, data in creates.items():
+            self.database.put_item(item_id, data)
+        for item_id in deletes:
+            self.database.delete_item(item_id)
+        
+        if checklist_id is None:
+            return None
+        checklist.update(checklist_update or {})
+        checklist['version'] = current_version + 1
+        return checklist['version']
+
+class MemoryRefreshTokenRepository(RefreshTokenRepository):
+    def __init__(self, database: MemoryDatabase):
+        self.database = database
+    
+    async def get(self, token_hash: str) -> Optional[dict]:
+        token = self.database.refresh_tokens.get(token_hash)
+        return copy_record(token_hash, token) if token is not None else None
+    
+    async def create(self, token_hash: str, data: dict):
+        self.database.refresh_tokens[token_hash] = dict(data)
+        self.database.refresh_token_hashes_by_user[data['user_id']][token_hash] = None
+    
+    async def rotate(self, token_hash: str, new_token_hash: str, new_data: dict, revoked_at: datetime) -> bool:
+        token = self.database.refresh_tokens.get(token_hash)
+        if token is None or token.get('revoked_at') is not None:
+            return False
+        token.update({"revoked_at": revoked_at, "replaced_by": new_token_hash})
+        await self.create(new_token_hash, new_data)
+        return True
+    
+    async def revoke(self, token_hash: str, revoked_at: datetime):
+        token = self.database.refresh_tokens.get(token_hash)
+        if token is not None and token.get('revoked_at') is None:
+            token['revoked_at'] = revoked_at
+    
+    async def revoke_for_user(self, user_id: str, revoked_at: datetime) -> int:
+        revoked = 0
+        for token_hash in self.database.refresh_token_hashes_by_user.get(user_id, ()):
+            token = self.database.refresh_tokens[token_hash]
+            if token.get('revoked_at') is None:
+                token['revoked_at'] = revoked_at
+                revoked += 1
+        return revoked
+
+def create_memory_storage() -> Storage:
+    database = MemoryDatabase()
+    return Storage(
+        name="memory",
+        users=MemoryUserRepository(database),
+        checklists=MemoryChecklistRepository(database),
+        items=MemoryItemRepository(database),
+        refresh_tokens=MemoryRefreshTokenRepository(database)
+    )
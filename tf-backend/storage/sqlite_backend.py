@@ -0,0 +1,394 @@
+import asyncio
+import json
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from storage.base import (
+    Storage, UserRepository, ChecklistRepository, ItemRepository, RefreshTokenRepository,
+    InvalidCursorError, VersionConflictError
+)
+
+# SQLite caps the number of bound parameters per statement
+SQLITE_IN_QUERY_LIMIT = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checklists (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS checklists_user_updated ON checklists (user_id, updated_at, id);
+CREATE TABLE IF NOT EXISTS checklist_items (
+    id TEXT PRIMARY KEY,
+    checklist_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS checklist_items_checklist ON checklist_items (checklist_id);
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS refresh_tokens_user ON refresh_tokens (user_id);
+"""
+
+def new_document_id() -> str:
+    return uuid.uuid4().hex[:20]
+
+def empty_counts() -> dict:
+    return {"items_count": 0, "completed_count": 0}
+
+def encode_value(value):
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    raise TypeError(f"Cannot store {type(value).__name__} in SQLite")
+
+def decode_object(obj: dict):
+    if len(obj) == 1 and "$datetime" in obj:
+        return datetime.fromisoformat(obj["$datetime"])
+    return obj
+
+def encode_data(data: dict) -> str:
+    return json.dumps(data, default=encode_value)
+
+def decode_row(row_id: str, data: str) -> dict:
+    record = json.loads(data, object_hook=decode_object)
+    record['id'] = row_id
+    return record
+
+def sort_timestamp(value: Optional[datetime]) -> Optional[str]:
+    """Fixed-width ISO string, so timestamps sort correctly as text"""
+    return value.isoformat(timespec='microseconds') if value is not None else None
+
+def chunked(values: List[str], size: int = SQLITE_IN_QUERY_LIMIT):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+class SQLiteDatabase:
+    """
+    A single SQLite connection owned by a one-thread executor.
+    Every job runs inside its own transaction, so each repository call is
+    atomic and never blocks the event loop.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self.connection = None
+    
+    def connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        return connection
+    
+    def call(self, func, args):
+        if self.connection is None:
+            self.connection = self.connect()
+        with self.connection:
+            return func(self.connection, *args)
+    
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.call, func, args)
+
+def update_data(connection: sqlite3.Connection, table: str, row_id: str, data: dict) -> Optional[dict]:
+    """Merge fields into the JSON document of a row and return the merged record"""
+    row = connection.execute(f"SELECT data FROM {table} WHERE id = ?", (row_id,)).fetchone()
+    if row is None:
+        raise KeyError(row_id)
+    record = decode_row(row_id, row[0])
+    record.pop('id')
+    record.update(data)
+    connection.execute(f"UPDATE {table} SET data = ? WHERE id = ?", (encode_data(record), row_id))
+    return record
+
+class SQLiteRepository:
+    table = None
+    
+    def __init__(self, database: SQLiteDatabase):
+        self.database = database
+    
+    def new_id(self) -> str:
+        return new_document_id()
+    
+    async def get(self, row_id: str) -> Optional[dict]:
+        def get_row(connection):
+            row = connection.execute(f"SELECT data FROM {self.table} WHERE id = ?", (row_id,)).fetchone()
+            return decode_row(row_id, row[0]) if row is not None else None
+        return await self.database.run(get_row)
+
+class SQLiteUserRepository(SQLiteRepository, UserRepository):
+    table = 'users'
+    
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        def get_row(connection):
+            row = connection.execute("SELECT id, data FROM users WHERE email = ?", (email,)).fetchone()
+            return decode_row(*row) if row is not None else None
+        return await self.database.run(get_row)
+    
+    async def create(self, data: dict) -> str:
+        user_id = self.new_id()
+        def insert(connection):
+            connection.execute(
+                "INSERT INTO users (id, email, data) VALUES (?, ?, ?)",
+                (user_id, data['email'], encode_data(data))
+            )
+        await self.database.run(insert)
+        return user_id
+    
+    async def update(self, user_id: str, data: dict):
+        def update(connection):
+            record = update_data(connection, 'users', user_id, data)
+            connection.execute("UPDATE users SET email = ? WHERE id = ?", (record['email'], user_id))
+        await self.database.run(update)
+    
+    async def increment(self, user_id: str, field: str, amount: int = 1):
+        def increment(connection):
+            row = connection.execute("SELECT data FROM users WHERE id = ?", (user_id,)).fetchone()
+            if row is None:
+                raise KeyError(user_id)
+            current = decode_row(user_id, row[0]).get(field, 0)
+            update_data(connection, 'users', user_id, {field: current + amount})
+        await self.database.run(increment)
+
+def insert_checklist(connection: sqlite3.Connection, checklist_id: str, data: dict):
+    connection.execute(
+        "INSERT INTO checklists (id, user_id, updated_at, data) VALUES (?, ?, ?, ?)",
+        (checklist_id, data['user_id'], sort_timestamp(data.get('updated_at')), encode_data(data))
+    )
+
+def checklist_version(connection: sqlite3.Connection, checklist_id: str, expected_version: Optional[int]) -> int:
+    """Current version of the checklist, raising VersionConflictError when it is missing or not expected_version"""
+    row = connection.execute("SELECT data FROM checklists WHERE id = ?", (checklist_id,)).fetchone()
+    current_version = decode_row(checklist_id, row[0]).get('version', 0) if row is not None else None
+    if current_version is None or (expected_version is not None and current_version != expected_version):
+        raise VersionConflictError(current_version)
+    return current_version
+
+def update_checklist_row(connection: sqlite3.Connection, checklist_id: str, data: dict):
+    record = update_data(connection, 'checklists', checklist_id, data)
+    connection.execute(
+        "UPDATE checklists SET updated_at = ? WHERE id = ?",
+        (sort_timestamp(record.get('updated_at')), checklist_id)
+    )
+
+def insert_items(connection: sqlite3.Connection, items: Dict[str, dict]):
+    connection.executemany(
+        "INSERT INTO checklist_items (id, checklist_id, data) VALUES (?, ?, ?)",
+        [(item_id, data['checklist_id'], encode_data(data)) for item_id, data in items.items()]
+    )
+
+class SQLiteChecklistRepository(SQLiteRepository, ChecklistRepository):
+    table = 'checklists'
+    
+    async def create(self, data: dict) -> str:
+        checklist_id = self.new_id()
+        await self.database.run(insert_checklist, checklist_id, data)
+        return checklist_id
+    
+    async def update_with_version(self, checklist_id: str, data: dict, expected_version: Optional[int] = None) -> int:
+        def update(connection):
+            current_version = checklist_version(connection, checklist_id, expected_version)
+            update_checklist_row(connection, checklist_id, {**data, "version": current_version + 1})
+            return current_version + 1
+        return await self.database.run(update)
+    
+    async def update_if_version(self, checklist_id: str, data: dict, expected_version: int):
+        def update(connection):
+            checklist_version(connection, checklist_id, expected_version)
+            update_checklist_row(connection, checklist_id, data)
+        await self.database.run(update)
+    
+    async def list_for_user(
+        self,
+        user_id: str,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        newest_first: bool = False
+    ) -> List[dict]:
+        def select(connection):
+            sql = "SELECT id, data FROM checklists WHERE user_id = ?"
+            params = [user_id]
+            
+            if start_after is not None:
+                cursor = connection.execute(
+                    "SELECT updated_at FROM checklists WHERE id = ? AND user_id = ?", (start_after, user_id)
+                ).fetchone()
+                if cursor is None:
+                    raise InvalidCursorError(start_after)
+                if newest_first:
+                    sql += " AND (updated_at < ? OR (updated_at = ? AND id < ?))"
+                    params += [cursor[0], cursor[0], start_after]
+                else:
+                    sql += " AND id > ?"
+                    params.append(start_after)
+            
+            sql += " ORDER BY updated_at DESC, id DESC" if newest_first else " ORDER BY id"
+            if limit is not None:
+                sql += " LIMIT ?"
+                params.append(limit)
+            
+            checklists = []
+            for row_id, data in connection.execute(sql, params):
+                checklist = decode_row(row_id, data)
+                if fields is not None:
+                    checklist = {field: checklist[field] for field in ['id', *fields] if field in checklist}
+                checklists.append(checklist)
+            return checklists
+        return await self.database.run(select)
+    
+    async def delete_with_items(self, checklist_id: str) -> int:
+        def delete(connection):
+            deleted_items = connection.execute(
+                "DELETE FROM checklist_items WHERE checklist_id = ?", (checklist_id,)
+            ).rowcount
+            connection.execute("DELETE FROM checklists WHERE id = ?", (checklist_id,))
+            return deleted_items
+        return await self.database.run(delete)
+    
+    async def create_many_with_items(self, rows: List[Tuple[str, dict, Dict[str, dict]]]):
+        def insert(connection):
+            for checklist_id, checklist_data, items in rows:
+                insert_checklist(connection, checklist_id, checklist_data)
+                insert_items(connection, items)
+        await self.database.run(insert)
+
+class SQLiteItemRepository(SQLiteRepository, ItemRepository):
+    table = 'checklist_items'
+    
+    async def list_for_checklist(self, checklist_id: str) -> List[dict]:
+        def select(connection):
+            rows = connection.execute(
+                "SELECT id, data FROM checklist_items WHERE checklist_id = ? ORDER BY id", (checklist_id,)
+            )
+            return [decode_row(row_id, data) for row_id, data in rows]
+        return await self.database.run(select)
+    
+    async def list_for_checklists(self, checklist_ids: List[str]) -> Dict[str, List[dict]]:
+        def select(connection):
+            items_by_checklist = {checklist_id: [] for checklist_id in checklist_ids}
+            for chunk in chunked(checklist_ids):
+                placeholders = ", ".join("?" * len(chunk))
+                rows = connection.execute(
+                    f"SELECT id, checklist_id, data FROM checklist_items WHERE checklist_id IN ({placeholders}) ORDER BY id",
+                    chunk
+                )
+                for row_id, checklist_id, data in rows:
+                    items_by_checklist[checklist_id].append(decode_row(row_id, data))
+            return items_by_checklist
+        return await self.database.run(select)
+    
+    async def count_for_checklists(self, checklist_ids: List[str]) -> Dict[str, dict]:
+        def select(connection):
+            counts_by_checklist = {checklist_id: empty_counts() for checklist_id in checklist_ids}
+            for chunk in chunked(checklist_ids):
+                placeholders = ", ".join("?" * len(chunk))
+                rows = connection.execute(
+                    f"SELECT checklist_id, COUNT(*), SUM(json_extract(data, '$.completed') = 1) "
+                    f"FROM checklist_items WHERE checklist_id IN ({placeholders}) GROUP BY checklist_id",
+                    chunk
+                )
+                for checklist_id, items_count, completed_count in rows:
+                    counts_by_checklist[checklist_id] = {
+                        "items_count": items_count,
+                        "completed_count": completed_count or 0
+                    }
+            return counts_by_checklist
+        return await self.database.run(select)
+    
+    async def get_many(self, item_ids: List[str]) -> Dict[str, dict]:
+        def select(connection):
+            items = {}
+            for chunk in chunked(item_ids):
+                placeholders = ", ".join("?" * len(chunk))
+                rows = connection.execute(f"SELECT id, data FROM checklist_items WHERE id IN ({placeholders})", chunk)
+                for row_id, data in rows:
+                    items[row_id] = decode_row(row_id, data)
+            return items
+        return await self.database.run(select)
+    
+    async def apply_changes(
+        self,
+        creates: Dict[str, dict],
+        updates: Dict[str, dict],
+        deletes: Iterable[str],
+        checklist_id: Optional[str] = None,
+        checklist_update: Optional[dict] = None,
+        expected_version: Optional[int] = None
+    ) -> Optional[int]:
+        deletes = list(deletes)
+        def write(connection):
+            if checklist_id is not None:
+                current_version = checklist_version(connection, checklist_id, expected_version)
+            
+            for item_id, data in updates.items():
+                update_data(connection, 'checklist_items', item_id, data)
+            insert_items(connection, creates)
+            connection.executemany("DELETE FROM checklist_items WHERE id = ?", [(item_id,) for item_id in deletes])
+            if checklist_id is None:
+                return None
+            update_checklist_row(connection, checklist_id, {**(checklist_update or {}), "version": current_version + 1})
+            return current_version + 1
+        return await self.database.run(write)
+
+def insert_refresh_token(connection: sqlite3.Connection, token_hash: str, data: dict):
+    connection.execute(
+        "INSERT INTO refresh_tokens (id, user_id, data) VALUES (?, ?, ?)",
+        (token_hash, data['user_id'], encode_data(data))
+    )
+
+class SQLiteRefreshTokenRepository(SQLiteRepository, RefreshTokenRepository):
+    table = 'refresh_tokens'
+    
+    async def create(self, token_hash: str, data: dict):
+        await self.database.run(insert_refresh_token, token_hash, data)
+    
+    async def rotate(self, token_hash: str, new_token_hash: str, new_data: dict, revoked_at: datetime) -> bool:
+        def rotate(connection):
+            row = connection.execute("SELECT data FROM refresh_tokens WHERE id = ?", (token_hash,)).fetchone()
+            if row is None or decode_row(token_hash, row[0]).get('revoked_at') is not None:
+                return False
+            update_data(connection, 'refresh_tokens', token_hash, {"revoked_at": revoked_at, "replaced_by": new_token_hash})
+            insert_refresh_token(connection, new_token_hash, new_data)
+            return True
+        return await self.database.run(rotate)
+    
+    async def revoke(self, token_hash: str, revoked_at: datetime):
+        def revoke(connection):
+            row = connection.execute("SELECT data FROM refresh_tokens WHERE id = ?", (token_hash,)).fetchone()
+            if row is not None and decode_row(token_hash, row[0]).get('revoked_at') is None:
+                update_data(connection, 'refresh_tokens', token_hash, {"revoked_at": revoked_at})
+        await self.database.run(revoke)
+    
+    async def revoke_for_user(self, user_id: str, revoked_at: datetime) -> int:
+        def revoke(connection):
+            rows = connection.execute(
+                "SELECT id FROM refresh_tokens WHERE user_id = ? AND json_extract(data, '$.revoked_at') IS NULL",
+                (user_id,)
+            ).fetchall()
+            for (token_hash,) in rows:
+                update_data(connection, 'refresh_tokens', token_hash, {"revoked_at": revoked_at})
+            return len(rows)
+        return await self.database.run(revoke)
+
+def create_sqlite_storage(path: str) -> Storage:
+    database = SQLiteDatabase(path)
+    return Storage(
+        name="sqlite",
+        users=SQLiteUserRepository(database),
+        checklists=SQLiteChecklistRepository(database),
+        items=SQLiteItemRepository(database),
+        refresh_tokens=SQLiteRefreshTokenRepository(database)
+    )
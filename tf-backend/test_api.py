@@ -19,6 +19,7 @@ TEST_NAME = "Usuario Teste"
 class APITester:
     def __init__(self):
         self.token = None
+        self.refresh_token = None
         self.user_id = None
         self.checklist_id = None
         self.session = requests.Session()
@@ -98,6 +99,7 @@ class APITester:
             if response.status_code == 200:
                 data = response.json()
                 token = data.get("access_token")
+                self.refresh_token = data.get("refresh_token")
                 
                 self.log_test(
                     "Login de usuário",
@@ -229,6 +231,64 @@ class APITester:
             self.log_test("Busca de checklist específica", False, f"Erro: {str(e)}")
             return False
     
+    def test_conditional_reads(self):
+        """Testa ETag/If-None-Match na listagem e na busca de checklist"""
+        print("🔧 Testando leituras condicionais (ETag)...")
+        
+        try:
+            # Listagem: a mesma tag retorna 304, e uma escrita troca a tag
+            response = self.session.get(f"{BASE_URL}/checklists")
+            list_etag = response.headers.get("ETag")
+            cached = self.session.get(f"{BASE_URL}/checklists", headers={"If-None-Match": list_etag})
+            if not list_etag or cached.status_code != 304:
+                self.log_test("Leituras condicionais", False, f"Listagem com If-None-Match retornou status {cached.status_code}")
+                return False
+            
+            self.session.put(f"{BASE_URL}/checklists/{self.checklist_id}", json={"category": "Teste"})
+            changed = self.session.get(f"{BASE_URL}/checklists", headers={"If-None-Match": list_etag})
+            if changed.status_code != 200 or changed.headers.get("ETag") == list_etag:
+                self.log_test("Leituras condicionais", False, f"Tag não mudou após escrita (status {changed.status_code})")
+                return False
+            
+            # Checklist específica: a própria tag retorna 304
+            response = self.session.get(f"{BASE_URL}/checklists/{self.checklist_id}")
+            checklist_etag = response.headers.get("ETag")
+            cached = self.session.get(f"{BASE_URL}/checklists/{self.checklist_id}", headers={"If-None-Match": checklist_etag})
+            if not checklist_etag or cached.status_code != 304:
+                self.log_test("Leituras condicionais", False, f"Checklist com If-None-Match retornou status {cached.status_code}")
+                return False
+            
+            # Checklist de outro usuário ou inexistente nunca responde 304, mesmo com uma tag que confere
+            other = requests.post(f"{BASE_URL}/auth/signup", json={
+                "email": f"test_{uuid.uuid4().hex[:8]}@teste.com",
+                "password": TEST_PASSWORD,
+                "name": TEST_NAME
+            }).json()
+            other_headers = {"Authorization": f"Bearer {other['access_token']}"}
+            foreign = requests.post(f"{BASE_URL}/checklists", json={"name": "Checklist de outro usuário"}, headers=other_headers).json()
+            foreign_status = self.session.get(
+                f"{BASE_URL}/checklists/{foreign['id']}", headers={"If-None-Match": f'"{foreign.get("version", 0)}"'}
+            ).status_code
+            missing_status = self.session.get(
+                f"{BASE_URL}/checklists/{uuid.uuid4().hex}", headers={"If-None-Match": '"0"'}
+            ).status_code
+            requests.delete(f"{BASE_URL}/checklists/{foreign['id']}", headers=other_headers)
+            
+            if foreign_status == 403 and missing_status == 404:
+                self.log_test("Leituras condicionais", True, "304 com a tag atual, tag nova após escrita, 403/404 sem acesso")
+                return True
+            else:
+                self.log_test(
+                    "Leituras condicionais",
+                    False,
+                    f"Checklist alheia retornou {foreign_status}, inexistente retornou {missing_status}"
+                )
+                return False
+                
+        except Exception as e:
+            self.log_test("Leituras condicionais", False, f"Erro: {str(e)}")
+            return False
+    
     def test_bulk_update_checklist_items_create(self):
         """Testa o novo endpoint otimizado - criação de itens em lote"""
         print("🔧 Testando criação de itens em lote (NOVO ENDPOINT)...")
@@ -366,6 +426,199 @@ class APITester:
             self.log_test("Operações mistas de itens", False, f"Erro: {str(e)}")
             return False
     
+    def patch_items(self, operations):
+        """Envia operações para PATCH /checklists/{id}/items"""
+        return self.session.patch(
+            f"{BASE_URL}/checklists/{self.checklist_id}/items",
+            json={"operations": operations}
+        )
+    
+    def test_patch_add_items(self):
+        """Testa PATCH com operações add"""
+        print("🔧 Testando PATCH de itens (add)...")
+        
+        try:
+            response = self.patch_items([
+                {"op": "add", "title": "Tarefa via PATCH A"},
+                {"op": "add", "title": "Tarefa via PATCH B", "completed": True}
+            ])
+            
+            if response.status_code == 200:
+                items = response.json().get("items", [])
+                positions = [item["position"] for item in items]
+                self.patch_item_ids = [item["id"] for item in items]
+                
+                # Os novos itens vão depois de todas as posições existentes
+                checklist = self.session.get(f"{BASE_URL}/checklists/{self.checklist_id}").json()
+                all_positions = [item["position"] for item in checklist.get("items", [])]
+                
+                if len(items) == 2 and len(set(all_positions)) == len(all_positions) and positions == sorted(positions):
+                    self.log_test("PATCH de itens - add", True, f"2 itens adicionados nas posições {positions}")
+                    return True
+                else:
+                    self.log_test("PATCH de itens - add", False, f"Posições inválidas: {all_positions}", response.json())
+                    return False
+            else:
+                self.log_test(
+                    "PATCH de itens - add",
+                    False,
+                    f"Status code: {response.status_code}",
+                    response.json() if response.text else None
+                )
+                return False
+                
+        except Exception as e:
+            self.log_test("PATCH de itens - add", False, f"Erro: {str(e)}")
+            return False
+    
+    def test_patch_update_item(self):
+        """Testa PATCH com operação update"""
+        print("🔧 Testando PATCH de itens (update)...")
+        
+        if not getattr(self, 'patch_item_ids', None):
+            self.log_test("PATCH de itens - update", False, "IDs de itens não disponíveis do teste anterior")
+            return False
+        
+        try:
+            response = self.patch_items([
+                {"op": "update", "id": self.patch_item_ids[0], "title": "Tarefa via PATCH A editada", "completed": True}
+            ])
+            
+            if response.status_code == 200:
+                item = response.json()["items"][0]
+                
+                if item["title"] == "Tarefa via PATCH A editada" and item["completed"]:
+                    self.log_test("PATCH de itens - update", True, "Item atualizado")
+                    return True
+                else:
+                    self.log_test("PATCH de itens - update", False, "Item não foi atualizado", response.json())
+                    return False
+            else:
+                self.log_test(
+                    "PATCH de itens - update",
+                    False,
+                    f"Status code: {response.status_code}",
+                    response.json() if response.text else None
+                )
+                return False
+                
+        except Exception as e:
+            self.log_test("PATCH de itens - update", False, f"Erro: {str(e)}")
+            return False
+    
+    def test_patch_delete_item(self):
+        """Testa PATCH com operação delete"""
+        print("🔧 Testando PATCH de itens (delete)...")
+        
+        if not getattr(self, 'patch_item_ids', None):
+            self.log_test("PATCH de itens - delete", False, "IDs de itens não disponíveis do teste anterior")
+            return False
+        
+        try:
+            deleted_id = self.patch_item_ids[1]
+            response = self.patch_items([{"op": "delete", "id": deleted_id}])
+            
+            if response.status_code == 200 and response.json().get("deleted_ids") == [deleted_id]:
+                checklist = self.session.get(f"{BASE_URL}/checklists/{self.checklist_id}").json()
+                remaining_ids = [item["id"] for item in checklist.get("items", [])]
+                
+                if deleted_id not in remaining_ids and checklist.get("items_count", len(remaining_ids)) == len(remaining_ids):
+                    self.log_test("PATCH de itens - delete", True, f"Item deletado, {len(remaining_ids)} itens restantes")
+                    return True
+                else:
+                    self.log_test("PATCH de itens - delete", False, "Item ainda presente na checklist", checklist)
+                    return False
+            else:
+                self.log_test(
+                    "PATCH de itens - delete",
+                    False,
+                    f"Status code: {response.status_code}",
+                    response.json() if response.text else None
+                )
+                return False
+                
+        except Exception as e:
+            self.log_test("PATCH de itens - delete", False, f"Erro: {str(e)}")
+            return False
+    
+    def test_patch_reorder_items(self):
+        """Testa PATCH com operação reorder (completa e parcial)"""
+        print("🔧 Testando PATCH de itens (reorder)...")
+        
+        try:
+            checklist = self.session.get(f"{BASE_URL}/checklists/{self.checklist_id}").json()
+            item_ids = [item["id"] for item in checklist.get("items", [])]
+            
+            # Um reorder parcial deixaria posições repetidas e é rejeitado
+            partial = self.patch_items([{"op": "reorder", "ids": item_ids[:1]}])
+            if len(item_ids) > 1 and partial.status_code != 400:
+                self.log_test("PATCH de itens - reorder", False, f"Reorder parcial retornou status {partial.status_code}")
+                return False
+            
+            new_order = list(reversed(item_ids))
+            response = self.patch_items([{"op": "reorder", "ids": new_order}])
+            
+            if response.status_code == 200:
+                checklist = self.session.get(f"{BASE_URL}/checklists/{self.checklist_id}").json()
+                items = checklist.get("items", [])
+                
+                if [item["id"] for item in items] == new_order and [item["position"] for item in items] == list(range(len(items))):
+                    self.log_test("PATCH de itens - reorder", True, f"{len(items)} itens reordenados")
+                    return True
+                else:
+                    self.log_test("PATCH de itens - reorder", False, "Ordem incorreta após reorder", checklist)
+                    return False
+            else:
+                self.log_test(
+                    "PATCH de itens - reorder",
+                    False,
+                    f"Status code: {response.status_code}",
+                    response.json() if response.text else None
+                )
+                return False
+                
+        except Exception as e:
+            self.log_test("PATCH de itens - reorder", False, f"Erro: {str(e)}")
+            return False
+    
+    def test_patch_move_item(self):
+        """Testa PATCH com operação move (só o item movido muda de posição)"""
+        print("🔧 Testando PATCH de itens (move)...")
+        
+        try:
+            checklist = self.session.get(f"{BASE_URL}/checklists/{self.checklist_id}").json()
+            item_ids = [item["id"] for item in checklist.get("items", [])]
+            if len(item_ids) < 3:
+                self.log_test("PATCH de itens - move", False, f"Esperado ao menos 3 itens, encontrado {len(item_ids)}")
+                return False
+            
+            # Move o último item para entre o primeiro e o segundo
+            response = self.patch_items([{"op": "move", "id": item_ids[-1], "after": item_ids[0], "before": item_ids[1]}])
+            
+            if response.status_code == 200 and len(response.json()["items"]) == 1:
+                checklist = self.session.get(f"{BASE_URL}/checklists/{self.checklist_id}").json()
+                new_order = [item["id"] for item in checklist.get("items", [])]
+                expected_order = [item_ids[0], item_ids[-1], *item_ids[1:-1]]
+                
+                if new_order == expected_order:
+                    self.log_test("PATCH de itens - move", True, "Item movido escrevendo apenas um documento")
+                    return True
+                else:
+                    self.log_test("PATCH de itens - move", False, "Ordem incorreta após move", checklist)
+                    return False
+            else:
+                self.log_test(
+                    "PATCH de itens - move",
+                    False,
+                    f"Status code: {response.status_code}",
+                    response.json() if response.text else None
+                )
+                return False
+                
+        except Exception as e:
+            self.log_test("PATCH de itens - move", False, f"Erro: {str(e)}")
+            return False
+    
     def test_checklist_with_items(self):
         """Testa se a checklist retorna os itens corretamente"""
         print("🔧 Testando checklist com itens...")
@@ -446,6 +699,216 @@ class APITester:
             self.log_test("Atualização de checklist", False, f"Erro: {str(e)}")
             return False
     
+    def test_export_checklists(self):
+        """Testa exportação NDJSON das checklists"""
+        print("🔧 Testando exportação de checklists...")
+        
+        try:
+            response = self.session.get(f"{BASE_URL}/checklists/export", stream=True)
+            
+            if response.status_code == 200:
+                lines = [json.loads(line) for line in response.iter_lines() if line]
+                exported = next((c for c in lines if c.get("id") == self.checklist_id), None)
+                
+                if exported is not None and isinstance(exported.get("items"), list):
+                    self.log_test(
+                        "Exportação de checklists",
+                        True,
+                        f"{len(lines)} checklists exportadas, {len(exported['items'])} itens na checklist de teste"
+                    )
+                    return True
+                else:
+                    self.log_test(
+                        "Exportação de checklists",
+                        False,
+                        "Checklist de teste não encontrada na exportação"
+                    )
+                    return False
+            else:
+                self.log_test(
+                    "Exportação de checklists",
+                    False,
+                    f"Status code: {response.status_code}",
+                    response.json() if response.text else None
+                )
+                return False
+                
+        except Exception as e:
+            self.log_test("Exportação de checklists", False, f"Erro: {str(e)}")
+            return False
+    
+    def test_import_checklists(self):
+        """Testa importação NDJSON com linhas válidas, inválidas e longas demais"""
+        print("🔧 Testando importação de checklists...")
+        
+        marker = f"Importada {uuid.uuid4().hex[:8]}"
+        rows = [
+            json.dumps({"name": f"{marker} A", "items": [{"title": "Item 1"}, {"title": "Item 2", "completed": True}]}),
+            json.dumps({"name": f"{marker} B"}),
+            json.dumps({"category": "sem nome"}),  # inválida: falta name
+            json.dumps({"name": f"{marker} C", "items": 5}),  # inválida: items não é lista
+            "x" * (1024 * 1024 + 1),  # linha acima do limite, descartada sem abortar a importação
+            json.dumps({"name": f"{marker} D", "items": [{"title": "Item 1"}]})
+        ]
+        body = "\n".join(rows) + "\n"
+        
+        try:
+            response = self.session.post(
+                f"{BASE_URL}/checklists/import",
+                data=body.encode(),
+                headers={"Content-Type": "application/x-ndjson"}
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                failed_lines = [error["line"] for error in data.get("errors", [])]
+                imported = [c for c in self.session.get(f"{BASE_URL}/checklists").json() if c["name"].startswith(marker)]
+                for checklist in imported:
+                    self.session.delete(f"{BASE_URL}/checklists/{checklist['id']}")
+                
+                if (data["created_checklists"] == 3 and data["created_items"] == 3 and data["failed_rows"] == 3
+                        and failed_lines == [3, 4, 5] and len(imported) == 3):
+                    self.log_test(
+                        "Importação de checklists",
+                        True,
+                        f"{data['created_checklists']} checklists importadas, {data['failed_rows']} linhas rejeitadas"
+                    )
+                    return True
+                else:
+                    self.log_test("Importação de checklists", False, "Contagens inesperadas na importação", data)
+                    return False
+            else:
+                self.log_test(
+                    "Importação de checklists",
+                    False,
+                    f"Status code: {response.status_code}",
+                    response.json() if response.text else None
+                )
+                return False
+                
+        except Exception as e:
+            self.log_test("Importação de checklists", False, f"Erro: {str(e)}")
+            return False
+    
+    def test_checklists_summary(self):
+        """Testa o resumo das checklists com contagem de itens"""
+        print("📊 Testando resumo das checklists...")
+        
+        try:
+            response = self.session.get(f"{BASE_URL}/checklists/summary")
+            
+            if response.status_code == 200:
+                summary = next((c for c in response.json() if c.get("id") == self.checklist_id), None)
+                
+                if summary is not None and summary["completed_count"] <= summary["items_count"]:
+                    self.log_test(
+                        "Resumo das checklists",
+                        True,
+                        f"{summary['completed_count']}/{summary['items_count']} itens concluídos na checklist de teste"
+                    )
+                    return True
+                else:
+                    self.log_test(
+                        "Resumo das checklists",
+                        False,
+                        "Checklist de teste não encontrada no resumo"
+                    )
+                    return False
+            else:
+                self.log_test(
+                    "Resumo das checklists",
+                    False,
+                    f"Status code: {response.status_code}",
+                    response.json() if response.text else None
+                )
+                return False
+                
+        except Exception as e:
+            self.log_test("Resumo das checklists", False, f"Erro: {str(e)}")
+            return False
+    
+    def test_refresh_token(self):
+        """Testa a renovação da sessão com refresh token e a rejeição de um token já usado"""
+        print("🔄 Testando refresh token...")
+        
+        try:
+            response = self.session.post(f"{BASE_URL}/auth/refresh", json={"refresh_token": self.refresh_token})
+            
+            if response.status_code != 200 or not response.json().get("refresh_token"):
+                self.log_test(
+                    "Refresh token",
+                    False,
+                    f"Status code: {response.status_code}",
+                    response.json() if response.text else None
+                )
+                return False
+            
+            # O token antigo foi rotacionado e não pode ser usado de novo
+            reuse = self.session.post(f"{BASE_URL}/auth/refresh", json={"refresh_token": self.refresh_token})
+            if reuse.status_code == 401:
+                self.log_test("Refresh token", True, "Sessão renovada e token antigo rejeitado")
+                return True
+            else:
+                self.log_test(
+                    "Refresh token",
+                    False,
+                    f"Token reutilizado retornou status {reuse.status_code}"
+                )
+                return False
+                
+        except Exception as e:
+            self.log_test("Refresh token", False, f"Erro: {str(e)}")
+            return False
+    
+    def test_password_change_revokes_tokens(self):
+        """Testa que a troca de senha revoga os access tokens anteriores"""
+        print("🔐 Testando revogação de tokens na troca de senha...")
+        
+        new_password = TEST_PASSWORD + "novo"
+        old_headers = {"Authorization": f"Bearer {self.token}"}
+        
+        try:
+            response = self.session.put(f"{BASE_URL}/auth/password", json={
+                "current_password": TEST_PASSWORD,
+                "new_password": new_password
+            })
+            
+            if response.status_code != 200:
+                self.log_test(
+                    "Revogação de tokens",
+                    False,
+                    f"Status code: {response.status_code}",
+                    response.json() if response.text else None
+                )
+                return False
+            
+            self.token = response.json()["access_token"]
+            self.session.headers.update({"Authorization": f"Bearer {self.token}"})
+            
+            old_statuses = [
+                requests.get(f"{BASE_URL}{path}", headers=old_headers).status_code
+                for path in ("/checklists", "/auth/me")
+            ]
+            new_statuses = [
+                self.session.get(f"{BASE_URL}{path}").status_code
+                for path in ("/checklists", "/auth/me")
+            ]
+            
+            if old_statuses == [401, 401] and new_statuses == [200, 200]:
+                self.log_test("Revogação de tokens", True, "Token antigo rejeitado e novo token aceito")
+                return True
+            else:
+                self.log_test(
+                    "Revogação de tokens",
+                    False,
+                    f"Token antigo: {old_statuses}, token novo: {new_statuses}"
+                )
+                return False
+                
+        except Exception as e:
+            self.log_test("Revogação de tokens", False, f"Erro: {str(e)}")
+            return False
+    
     def cleanup(self):
         """Limpa os dados de teste"""
         print("🧹 Limpando dados de teste...")
@@ -471,13 +934,24 @@ class APITester:
         tests = [
             self.test_user_signup,
             self.test_user_login,
+            self.test_refresh_token,
             self.test_create_checklist,
             self.test_get_checklists,
             self.test_get_single_checklist,
+            self.test_conditional_reads,
             self.test_bulk_update_checklist_items_create,
             self.test_bulk_update_checklist_items_mixed,
             self.test_checklist_with_items,
-            self.test_update_checklist
+            self.test_patch_add_items,
+            self.test_patch_update_item,
+            self.test_patch_delete_item,
+            self.test_patch_reorder_items,
+            self.test_patch_move_item,
+            self.test_update_checklist,
+            self.test_export_checklists,
+            self.test_import_checklists,
+            self.test_checklists_summary,
+            self.test_password_change_revokes_tokens
         ]
         
         for test in tests:
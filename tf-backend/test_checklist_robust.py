@@ -471,6 +471,44 @@ class ChecklistTester:
             )
             return False
     
+    def test_concurrent_same_checklist(self):
+        """Testa atualizações concorrentes na mesma checklist"""
+        print("🔧 Testando atualizações concorrentes na mesma checklist...")
+        
+        if not self.checklist_ids:
+            self.log_test("Concorrência na mesma checklist", False, "Não há checklists disponíveis")
+            return False
+        
+        checklist_id = self.checklist_ids[0]
+        
+        def replace_items(thread_id):
+            items = [{"title": f"Thread {thread_id} - Item {i+1}", "completed": False} for i in range(5)]
+            response = self.session.put(f"{BASE_URL}/checklists/{checklist_id}/items", json={"items": items})
+            return response.status_code
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+            status_codes = list(executor.map(replace_items, range(1, 4)))
+        
+        response = self.session.get(f"{BASE_URL}/checklists/{checklist_id}")
+        items = response.json().get("items", []) if response.status_code == 200 else []
+        writers = {item["title"].split(" - ")[0] for item in items}
+        
+        # Each write either wins entirely or is rejected with 409, never merged with another
+        if all(code in (200, 409) for code in status_codes) and len(items) == 5 and len(writers) == 1:
+            self.log_test(
+                "Concorrência na mesma checklist",
+                True,
+                f"Status: {status_codes}, itens finais de {writers.pop()}"
+            )
+            return True
+        else:
+            self.log_test(
+                "Concorrência na mesma checklist",
+                False,
+                f"Status: {status_codes}, {len(items)} itens de {len(writers)} escritores"
+            )
+            return False
+    
     def test_checklist_integrity(self):
         """Testa integridade dos dados das checklists"""
         print("🔧 Testando integridade dos dados...")
@@ -626,6 +664,7 @@ class ChecklistTester:
             ("Operações Complexas", self.test_complex_bulk_operations),
             ("Casos Extremos", self.test_edge_cases),
             ("Operações Concorrentes", self.test_concurrent_operations),
+            ("Concorrência na Mesma Checklist", self.test_concurrent_same_checklist),
             ("Integridade dos Dados", self.test_checklist_integrity),
             ("Comparação de Performance", self.test_performance_comparison)
         ]
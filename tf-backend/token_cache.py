@@ -0,0 +1,73 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from config import settings
+from models import TokenData
+
+class TokenCache:
+    """
+    In-process LRU cache of verified access token claims, keyed by the SHA-256
+    of the token and kept until the token's exp claim, so repeated requests with
+    the same bearer token skip the signature check and payload parsing.
+    """
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # token hash -> (exp, token_data)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+    
+    @staticmethod
+    def key(token: str) -> str:
+        # Keeps raw bearer tokens out of memory and bounds the key size
+        return hashlib.sha256(token.encode()).hexdigest()
+    
+    def get(self, token: str) -> Optional[TokenData]:
+        """Return the cached claims, or None if missing or the token has expired"""
+        if not self.enabled:
+            return None
+        key = self.key(token)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, token: str, token_data: TokenData, exp: float):
+        """Store the claims of a verified token until exp (Unix time), evicting the least recently used entries when full"""
+        if not self.enabled:
+            return
+        key = self.key(token)
+        with self.lock:
+            self.entries[key] = (exp, token_data)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+    
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+# Global cache of decoded access tokens
+token_cache = TokenCache(max_size=settings.token_cache_max_size)
@@ -0,0 +1,163 @@
+import json
+import secrets
+import sys
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Optional
+from config import settings
+
+class Span:
+    """A timed operation with attributes, linked to its parent through the trace id"""
+    
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.status = "ok"
+        self.error = None
+        self.start_time = time.time()
+        self.start_counter = time.perf_counter()
+        self.duration = None
+    
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+    
+    def record_error(self, error: BaseException):
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+    
+    def end(self):
+        self.duration = time.perf_counter() - self.start_counter
+    
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+class NoopSpan:
+    """Span returned while tracing is disabled; every call is a no-op"""
+    
+    def set_attribute(self, key: str, value):
+        pass
+    
+    def record_error(self, error: BaseException):
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+NOOP_SPAN = NoopSpan()
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+class SpanContext:
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span = None
+        self.token = None
+    
+    def __enter__(self) -> Span:
+        parent = current_span.get()
+        self.span = Span(
+            self.name,
+            trace_id=parent.trace_id if parent is not None else secrets.token_hex(16),
+            parent_id=parent.span_id if parent is not None else None,
+            attributes=self.attributes
+        )
+        self.token = current_span.set(self.span)
+        return self.span
+    
+    def __exit__(self, exc_type, exc, traceback):
+        current_span.reset(self.token)
+        if exc is not None:
+            self.span.record_error(exc)
+        self.span.end()
+        self.tracer.exporter.export(self.span)
+        return False
+
+class InMemoryExporter:
+    """Keeps the most recent spans so they can be inspected locally"""
+    
+    def __init__(self, max_spans: int):
+        self.spans = deque(maxlen=max_spans)
+    
+    def export(self, span: Span):
+        self.spans.append(span.to_dict())
+    
+    def traces(self, limit: int = 20) -> list:
+        """Group the kept spans by trace, most recent trace first"""
+        traces = OrderedDict()
+        for span in reversed(self.spans):
+            traces.setdefault(span["trace_id"], []).append(span)
+        return [
+            {"trace_id": trace_id, "spans": sorted(spans, key=lambda span: span["start_time"])}
+            for trace_id, spans in list(traces.items())[:limit]
+        ]
+
+class ConsoleExporter:
+    """Writes each finished span as a JSON line on stderr"""
+    
+    def export(self, span: Span):
+        print(json.dumps(span.to_dict(), default=str), file=sys.stderr, flush=True)
+
+class Tracer:
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+    
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+    
+    def start_span(self, name: str, **attributes):
+        """Context manager timing a span; returns a shared no-op span while tracing is disabled"""
+        if self.exporter is None:
+            return NOOP_SPAN
+        return SpanContext(self, name, attributes)
+
+class TracingMiddleware:
+    """ASGI middleware opening the root span of every HTTP request"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+        
+        with tracer.start_span("http.request", **{"http.method": scope["method"], "http.path": scope["path"]}) as span:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                await send(message)
+            
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                span.set_attribute("http.route", getattr(scope.get("route"), "path", None))
+
+def create_exporter(name: str):
+    if name == "memory":
+        return InMemoryExporter(settings.tracing_max_spans)
+    if name == "console":
+        return ConsoleExporter()
+    return None
+
+# Global tracer; a no-op unless settings.tracing_exporter selects an exporter
+tracer = Tracer(create_exporter(settings.tracing_exporter))